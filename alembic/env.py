@@ -12,6 +12,7 @@ from app.Tables.CropRecommendations import CropRecommendation
 from app.Tables.Feedbacks import Feedback
 from app.Tables.Notiifcaitions import Notification
 from app.Tables.CropGuidance import CropGuidances
+from app.Tables.GuidanceBlobs import GuidanceBlob
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,54 @@
+"""adding (user_id, created_at desc, id) indexes for the history endpoints
+
+Revision ID: 76d3fae362b7
+Revises: e87251672c06
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76d3fae362b7'
+down_revision: Union[str, None] = 'e87251672c06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    'crop_recommendations',
+    'crop_predictions',
+    'crop_guidance_table',
+    'feedbacks',
+    'notifications',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently so the history tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_user_id_created_at',
+                table,
+                ['user_id', sa.text('created_at DESC'), 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        # the composite index covers every lookup the single-column one served
+        op.drop_index('ix_crop_guidance_table_user_id', table_name='crop_guidance_table',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_crop_guidance_table_user_id', 'crop_guidance_table', ['user_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_user_id_created_at', table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,170 @@
+"""adding the guidance_blobs table and moving guidance_response into it
+
+Revision ID: a33e52a50b68
+Revises: f8f1c8c0f393
+Create Date: 2026-10-18 16:41:07.918263
+
+"""
+import hashlib
+import struct
+import zlib
+from collections import Counter
+from typing import Sequence, Union
+
+import orjson
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a33e52a50b68'
+down_revision: Union[str, None] = 'f8f1c8c0f393'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# The blob format is frozen here rather than imported from the app, so this
+# revision keeps producing what the app read when it was written:
+# crc32 + length of the canonical JSON, then raw DEFLATE ended by a sync flush.
+_SEGMENT_HEADER = struct.Struct("<II")
+
+guidances = sa.table(
+    'crop_guidance_table',
+    sa.column('id', sa.BigInteger),
+    sa.column('guidance_response', postgresql.JSONB),
+    sa.column('guidance_compressed', sa.LargeBinary),
+    sa.column('guidance_sha256', sa.String),
+)
+blobs = sa.table(
+    'guidance_blobs',
+    sa.column('sha256', sa.String),
+    sa.column('content', sa.LargeBinary),
+    sa.column('size', sa.Integer),
+    sa.column('summary', sa.Text),
+    sa.column('ref_count', sa.Integer),
+)
+
+
+def _canonical(guidance) -> bytes:
+    # same bytes, and so the same key, as app.utils.guidance_blobs.canonical_guidance
+    return orjson.dumps(guidance, option=orjson.OPT_SORT_KEYS)
+
+
+def _segment(data: bytes) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return _SEGMENT_HEADER.pack(zlib.crc32(data), len(data)) + compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _inflate(segment: bytes) -> bytes:
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(bytes(segment)[_SEGMENT_HEADER.size:])
+
+
+def _summary(guidance):
+    summary = guidance.get('summary') if isinstance(guidance, dict) else None
+    if summary is None or isinstance(summary, str):
+        return summary
+    return orjson.dumps(summary).decode('utf-8')
+
+
+def _backfill(bind):
+    """Moves every guidance_response into guidance_blobs, one batch of rows at a time."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(guidances.c.id, guidances.c.guidance_response)
+            .where(guidances.c.id > last_id)
+            .order_by(guidances.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        keys, documents, counts = {}, {}, Counter()
+        for row in rows:
+            data = _canonical(row.guidance_response)
+            sha256 = hashlib.sha256(data).hexdigest()
+            keys[row.id] = sha256
+            documents[sha256] = (data, row.guidance_response)
+            counts[sha256] += 1
+
+        existing = set(bind.execute(
+            sa.select(blobs.c.sha256).where(blobs.c.sha256.in_(list(counts)))
+        ).scalars())
+
+        new = [sha256 for sha256 in counts if sha256 not in existing]
+        if new:
+            bind.execute(blobs.insert(), [
+                {
+                    'sha256': sha256,
+                    'content': _segment(documents[sha256][0]),
+                    'size': len(documents[sha256][0]),
+                    'summary': _summary(documents[sha256][1]),
+                    'ref_count': counts[sha256],
+                }
+                for sha256 in new
+            ])
+        if existing:
+            bind.execute(
+                blobs.update()
+                .where(blobs.c.sha256 == sa.bindparam('key'))
+                .values(ref_count=blobs.c.ref_count + sa.bindparam('count')),
+                [{'key': sha256, 'count': counts[sha256]} for sha256 in existing]
+            )
+
+        bind.execute(
+            guidances.update()
+            .where(guidances.c.id == sa.bindparam('row_id'))
+            .values(guidance_sha256=sa.bindparam('key')),
+            [{'row_id': row_id, 'key': sha256} for row_id, sha256 in keys.items()]
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('guidance_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('content', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('crop_guidance_table', sa.Column('guidance_sha256', sa.String(length=64), nullable=True))
+
+    _backfill(op.get_bind())
+
+    op.alter_column('crop_guidance_table', 'guidance_sha256', nullable=False)
+    op.create_foreign_key(
+        'crop_guidance_table_guidance_sha256_fkey', 'crop_guidance_table', 'guidance_blobs',
+        ['guidance_sha256'], ['sha256']
+    )
+    op.create_index(op.f('ix_crop_guidance_table_guidance_sha256'), 'crop_guidance_table', ['guidance_sha256'], unique=False)
+    op.drop_column('crop_guidance_table', 'guidance_compressed')
+    op.drop_column('crop_guidance_table', 'guidance_response')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('crop_guidance_table', sa.Column('guidance_response', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('crop_guidance_table', sa.Column('guidance_compressed', sa.LargeBinary(), nullable=True))
+
+    bind = op.get_bind()
+    for blob in bind.execute(sa.select(blobs.c.sha256, blobs.c.content)).yield_per(BATCH_SIZE):
+        bind.execute(
+            guidances.update()
+            .where(guidances.c.guidance_sha256 == blob.sha256)
+            .values(
+                guidance_response=orjson.loads(_inflate(blob.content)),
+                guidance_compressed=blob.content,
+            )
+        )
+
+    op.alter_column('crop_guidance_table', 'guidance_response', nullable=False)
+    op.drop_index(op.f('ix_crop_guidance_table_guidance_sha256'), table_name='crop_guidance_table')
+    op.drop_constraint('crop_guidance_table_guidance_sha256_fkey', 'crop_guidance_table', type_='foreignkey')
+    op.drop_column('crop_guidance_table', 'guidance_sha256')
+    op.drop_table('guidance_blobs')
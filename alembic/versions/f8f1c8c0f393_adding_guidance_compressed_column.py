@@ -0,0 +1,29 @@
+"""adding the guidance_compressed column to crop_guidance_table
+
+Revision ID: f8f1c8c0f393
+Revises: 76d3fae362b7
+Create Date: 2026-10-18 14:03:19.274551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8f1c8c0f393'
+down_revision: Union[str, None] = '76d3fae362b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable: rows written before this revision are compressed when they are read
+    op.add_column('crop_guidance_table', sa.Column('guidance_compressed', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('crop_guidance_table', 'guidance_compressed')
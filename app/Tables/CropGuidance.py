@@ -1,13 +1,17 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Date, func
+import orjson
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Date, Index, ForeignKey, func
+from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from app.database.database import Base
+from app.Tables.GuidanceBlobs import GuidanceBlob
+from app.utils.compression import inflate_segment
 
 class CropGuidances(Base):
     __tablename__ = "crop_guidance_table"
 
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(BigInteger, nullable=True, index=True) 
+    user_id = Column(BigInteger, nullable=True)
     crop_name = Column(String(100), nullable=False)
     land_size = Column(Float, nullable=False)
     soil_type = Column(String(50), nullable=False)
@@ -17,6 +21,17 @@ class CropGuidances(Base):
     equipment = Column(String(200), nullable=True)
     planting_date = Column(Date, nullable=True)
     growing_season = Column(String(50), nullable=True)
-    guidance_response = Column(JSONB, nullable=False)  # Full detailed Gemini output
+    # Full detailed Gemini output, stored once per distinct guidance in guidance_blobs
+    guidance_sha256 = Column(String(64), ForeignKey("guidance_blobs.sha256"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    blob = relationship(GuidanceBlob, lazy="joined", innerjoin=True)
+
+    __table_args__ = (
+        Index("ix_crop_guidance_table_user_id_created_at", "user_id", created_at.desc(), "id"),
+    )
+
+    @property
+    def guidance_response(self) -> dict:
+        return orjson.loads(inflate_segment(self.blob.content))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 
@@ -14,3 +14,7 @@ class Feedback(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="feedbacks")
+
+    __table_args__ = (
+        Index("ix_feedbacks_user_id_created_at", "user_id", created_at.desc(), "id"),
+    )
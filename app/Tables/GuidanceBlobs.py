@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, func
+from app.database.database import Base
+
+class GuidanceBlob(Base):
+    __tablename__ = "guidance_blobs"
+
+    # sha256 of the canonical (sorted-key) guidance JSON, shared by every identical guidance
+    sha256 = Column(String(64), primary_key=True)
+    content = Column(LargeBinary, nullable=False)  # gzip segment (app.utils.compression)
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    summary = Column(Text, nullable=True)  # the guidance's "summary", for list views
+    ref_count = Column(Integer, nullable=False, default=1)  # crop_guidance_table rows pointing here
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
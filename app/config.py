@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import List, Optional
 
 class Settings(BaseSettings):
 
@@ -28,6 +29,82 @@ class Settings(BaseSettings):
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
 
+    GEMINI_HTTP2: bool = True
+    GEMINI_TIMEOUT_SECONDS: float = 60.0
+    GEMINI_GUIDANCE_TIMEOUT_SECONDS: float = 180.0
+    GEMINI_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    GEMINI_MAX_CONNECTIONS: int = 100
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GEMINI_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 0
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # default wait budget of checkout_within; None waits the full pool timeout
+    DB_POOL_WAIT_BUDGET_SECONDS: Optional[float] = 0.5
+
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 2.0
+
+    GEMINI_CACHE_ENABLED: bool = True
+    GEMINI_CACHE_TTL_SECONDS: int = 86400
+    GEMINI_CACHE_LOCAL_TTL_SECONDS: int = 600
+    GEMINI_CACHE_LOCAL_MAXSIZE: int = 1024
+
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    BULK_PASSWORD_HASH_WORKERS: Optional[int] = None
+    BULK_REGISTER_MAX_ROWS: int = 10000
+
+    # when Redis is unreachable, accept tokens (True) or reject them (False)
+    SESSION_REVOCATION_FAIL_OPEN: bool = True
+
+    IDENTITY_CACHE_ENABLED: bool = True
+    IDENTITY_CACHE_TTL_SECONDS: int = 300
+    IDENTITY_CACHE_LOCAL_TTL_SECONDS: int = 5
+    IDENTITY_CACHE_LOCAL_MAXSIZE: int = 10000
+
+    GEMINI_SINGLEFLIGHT_RESULT_TTL_SECONDS: int = 60
+    GEMINI_SINGLEFLIGHT_POLL_INTERVAL_SECONDS: float = 0.25
+
+    GUIDANCE_JOB_BACKEND: str = "asyncio"  # asyncio | celery
+    GUIDANCE_JOB_CONCURRENCY: int = 4
+    GUIDANCE_JOB_QUEUE_SIZE: int = 1000
+    GUIDANCE_JOB_TTL_SECONDS: int = 86400
+    CELERY_BROKER_URL: Optional[str] = None
+
+    MODEL_CACHE_DIR: Optional[str] = None
+    # load every model in lifespan instead of on first use; trades startup time for a fast first request
+    MODEL_WARMUP: bool = False
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CONTENT_TYPES: List[str] = [
+        "application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html",
+    ]
+    # stored guidance is compressed once at write time, so it can afford the slowest level
+    GUIDANCE_GZIP_LEVEL: int = 9
+
+    PAGE_SIZE_DEFAULT: int = 20
+    PAGE_SIZE_MAX: int = 100
+
+    CROP_BATCH_MAX_ROWS: int = 1000
+    # larger batches go through sklearn's forest, which overtakes the flat one around here
+    CROP_FLAT_FOREST_MAX_ROWS: int = 256
+    # same for the yield tree: it is 53 levels deep, so the flat walk only wins on a few rows
+    YIELD_FLAT_TREE_MAX_ROWS: int = 4
+    GEMINI_BATCH_CONCURRENCY: int = 8
+    YIELD_CSV_CHUNK_ROWS: int = 5000
+    YIELD_SWEEP_MAX_POINTS: int = 20000
+
     class Config:
         env_file = ".env"
         case_sensitive = False
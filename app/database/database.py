@@ -1,11 +1,27 @@
-from sqlalchemy import create_engine
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import create_engine, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
-from sqlalchemy.pool import QueuePool
+from app.database.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool, checkout_budget
 import redis
+import redis.asyncio
 
-redis_client = redis.StrictRedis(host="localhost", port=6379, db=0, decode_responses=True)
+redis_client = redis.StrictRedis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+)
+
+async_redis_client = redis.asyncio.StrictRedis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+)
 
 DATABASE_URL = f"postgresql://{settings.DATABASE_USERNAME}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOSTNAME}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
 
@@ -14,14 +30,35 @@ if not DATABASE_URL:
 
 engine = create_engine(
     DATABASE_URL,
-    poolclass=QueuePool,  
-    pool_size=20,         
-    max_overflow=0,    
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
     echo=False  
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncpg engine for async routes; Alembic and the sync routes keep using `engine`
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    echo=False
+)
+
+# expire_on_commit=False: attributes stay readable after commit without an
+# implicit (and, in async code, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -31,5 +68,31 @@ def get_db():
     finally:
         db.close()
 
+def checkout_within(db, budget: Optional[float] = settings.DB_POOL_WAIT_BUDGET_SECONDS):
+    """
+    Checks the session's connection out now and answers 503 when none
+    frees up within `budget` seconds, instead of holding the request for
+    the full pool timeout. Call it right before a write, once any slow
+    awaits are done, so the connection is not held across them.
+    """
+    if budget is None:
+        return
+    with checkout_budget(budget):
+        try:
+            db.connection()
+        except exc.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def shutdown_database():
     engine.dispose()
+
+async def shutdown_async_database():
+    await async_engine.dispose()
@@ -0,0 +1,145 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# upper bounds (seconds) of the checkout wait histogram; the last bucket is +Inf
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# per-request override of the pool timeout, see `checkout_budget`
+_checkout_timeout: ContextVar[Optional[float]] = ContextVar("pool_checkout_timeout", default=None)
+
+# the pool whose outer _do_get is running in this thread or task; a ContextVar
+# rather than a thread-local because every async checkout shares the loop thread
+_checking_out: ContextVar[Optional[object]] = ContextVar("pool_checking_out", default=None)
+
+
+@contextmanager
+def checkout_budget(seconds: Optional[float]):
+    """Checkouts inside this block give up after `seconds` instead of the pool timeout."""
+    token = _checkout_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _checkout_timeout.reset(token)
+
+
+class PoolMetrics:
+    """Checkout wait histogram, timeouts and connection ages of one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.age_count = 0
+        self.age_seconds = 0.0
+        self.max_age_seconds = 0.0
+
+    def observe_wait(self, seconds: float):
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+        with self._lock:
+            self.wait_buckets[bucket] += 1
+            self.wait_count += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_age(self, seconds: float):
+        with self._lock:
+            self.age_count += 1
+            self.age_seconds += seconds
+            self.max_age_seconds = max(self.max_age_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, histogram = 0, {}
+            for bound, count in zip([*map(str, WAIT_BUCKETS), "+Inf"], self.wait_buckets):
+                cumulative += count
+                histogram[bound] = cumulative
+            return {
+                "checkouts": self.wait_count,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "wait_histogram_seconds": histogram,
+                "avg_wait_ms": round(self.wait_seconds / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "avg_connection_age_seconds": round(self.age_seconds / self.age_count, 1) if self.age_count else 0.0,
+                "max_connection_age_seconds": round(self.max_age_seconds, 1),
+            }
+
+
+class _Instrumented:
+    """
+    Times every checkout (including the wait for a free connection), counts
+    pool timeouts and records the age of each connection handed out.
+    `_timeout` becomes a property so `checkout_budget` can shorten the wait
+    for the current request without touching other threads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.metrics = PoolMetrics()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def _timeout(self) -> float:
+        budget = _checkout_timeout.get()
+        return self._default_timeout if budget is None else min(budget, self._default_timeout)
+
+    @_timeout.setter
+    def _timeout(self, value: float):
+        self._default_timeout = value
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only the outer call is timed
+        if _checking_out.get() is self:
+            return super()._do_get()
+
+        token = _checking_out.set(self)
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        finally:
+            _checking_out.reset(token)
+            self.metrics.observe_wait(time.perf_counter() - started)
+
+        if record.starttime:
+            self.metrics.observe_age(time.time() - record.starttime)
+        return record
+
+    def _create_connection(self):
+        self.metrics.connects += 1
+        return super()._create_connection()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self._default_timeout,
+            "recycle_seconds": self._recycle,
+            "pre_ping": self._pre_ping,
+            **self.metrics.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_Instrumented, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_Instrumented, AsyncAdaptedQueuePool):
+    pass
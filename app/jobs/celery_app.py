@@ -0,0 +1,38 @@
+import asyncio
+from celery import Celery
+from app.config import settings
+from app.jobs.queue import JOBS
+import app.jobs.guidance  # noqa: F401  registers the guidance jobs
+
+celery_app = Celery(
+    "kisanmitra",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+)
+
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+)
+
+# One event loop per worker process, so pooled HTTP and Redis clients
+# created by the jobs stay bound to the loop that uses them.
+_loop = None
+
+
+def _run(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+def _make_task(name, fn):
+    @celery_app.task(name=name)
+    def task(*args):
+        _run(fn(*args))
+    return task
+
+
+for _name, _fn in JOBS.items():
+    _make_task(_name, _fn)
@@ -0,0 +1,119 @@
+from contextlib import suppress
+from datetime import datetime, timezone
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+from schema import CropFormRequest
+from geminiResponse import acall_gemini_for_guidance
+from app.config import settings
+from app.database.database import SessionLocal
+from app.Tables.CropGuidance import CropGuidances
+from app.Tables.Notiifcaitions import Notification
+from app.jobs.queue import register_job, get_job_backend, QueueFull, JobBackendUnavailable
+from app.utils.guidance_blobs import store_guidance_blob
+
+GUIDANCE_JOB = "guidance.generate"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def save_guidance(db: Session, user_id: int, crop_data: CropFormRequest, guidance: dict, commit: bool = True):
+    """Build the crop_guidance_table row for a generated guidance and persist it."""
+    db_entry = CropGuidances(
+        user_id=user_id,
+        crop_name=crop_data.crop,
+        land_size=crop_data.land_size, #type:ignore
+        soil_type=crop_data.soil_type,  #type:ignore
+        location=crop_data.location,
+        irrigation_method=crop_data.irrigation,
+        fertilizer={
+            "type": crop_data.fertilizer.type,  #type:ignore
+            "amount": crop_data.fertilizer.amount,  #type:ignore
+            "schedule": crop_data.fertilizer.schedule  #type:ignore
+        },
+        equipment=crop_data.equipment, 
+        planting_date=crop_data.planting_date or None, #type:ignore
+        growing_season=crop_data.growing_season,  #type:ignore
+        guidance_sha256=store_guidance_blob(db, guidance)
+    )
+    db.add(db_entry)
+    if commit:
+        db.commit()
+        db.refresh(db_entry)
+
+    return db_entry
+
+
+def _persist_job_result(user_id: int, job_id: str, crop_data: CropFormRequest, guidance: dict) -> int:
+    db = SessionLocal()
+    try:
+        db_entry = save_guidance(db, user_id, crop_data, guidance, commit=False)
+        db.flush()
+        db.add(Notification(
+            user_id=user_id,
+            title="Crop guidance ready",
+            message=f"Your guidance for {crop_data.crop} is ready (job {job_id}, guidance #{db_entry.id}).",
+            type="guidance_ready",
+            is_read=False
+        ))
+        db.commit()
+        return db_entry.id #type:ignore
+    finally:
+        db.close()
+
+
+def _notify_failure(user_id: int, job_id: str, crop_data: CropFormRequest):
+    db = SessionLocal()
+    try:
+        db.add(Notification(
+            user_id=user_id,
+            title="Crop guidance failed",
+            message=f"We could not generate your guidance for {crop_data.crop} (job {job_id}). Please try again.",
+            type="guidance_failed",
+            is_read=False
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+@register_job(GUIDANCE_JOB)
+async def generate_guidance(job_id: str, user_id: int, payload: dict):
+    """Generate guidance for a queued job, store the row and notify the user."""
+    store = get_job_backend().store
+    crop_data = CropFormRequest(**payload)
+    await store.update(job_id, status="running", started_at=_now())
+
+    try:
+        guidance = await acall_gemini_for_guidance(crop_data, api_key=settings.GEMINI_API_KEY)
+        guidance_id = await run_in_threadpool(_persist_job_result, user_id, job_id, crop_data, guidance)
+    except Exception as e:
+        await store.update(job_id, status="failed", error=str(e), finished_at=_now())
+        await run_in_threadpool(_notify_failure, user_id, job_id, crop_data)
+        raise
+
+    await store.update(job_id, status="done", guidance_id=guidance_id, finished_at=_now())
+
+
+async def enqueue_guidance(job_id: str, user_id: int, crop_data: CropFormRequest) -> dict:
+    backend = get_job_backend()
+    record = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "status": "queued",
+        "created_at": _now(),
+    }
+    try:
+        await backend.store.create(job_id, record)
+    except RedisError as e:
+        raise JobBackendUnavailable(f"Could not record job {job_id} ({e})")
+    try:
+        await backend.submit(GUIDANCE_JOB, job_id, user_id, crop_data.dict())
+    except (QueueFull, JobBackendUnavailable):
+        # best effort: the store may be down along with the queue
+        with suppress(RedisError):
+            await backend.store.update(job_id, status="rejected", finished_at=_now())
+        raise
+    return record
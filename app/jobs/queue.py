@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+from app.config import settings
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
+from app.database.database import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[..., Awaitable[None]]
+
+# name -> coroutine function; filled by @register_job in the job modules
+JOBS: Dict[str, JobFunc] = {}
+
+
+def register_job(name: str):
+    def decorator(fn: JobFunc) -> JobFunc:
+        JOBS[name] = fn
+        return fn
+    return decorator
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobBackendUnavailable(Exception):
+    """The queue or broker could not be reached, so the job was not submitted."""
+
+
+# ------------ Job status store -------------
+
+class RedisJobStore:
+    """Job records shared by every API worker and Celery worker."""
+
+    def __init__(self, ttl: int, namespace: str = "jobs"):
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.namespace}:{job_id}"
+
+    async def create(self, job_id: str, record: dict):
+        await async_redis_client.set(self._key(job_id), json.dumps(record), ex=self.ttl)
+
+    async def update(self, job_id: str, **fields):
+        record = await self.get(job_id) or {}
+        record.update(fields)
+        await async_redis_client.set(self._key(job_id), json.dumps(record), ex=self.ttl)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        raw = await async_redis_client.get(self._key(job_id))
+        return json.loads(raw) if raw is not None else None
+
+
+# ------------ Backends -------------
+
+class AsyncioJobBackend:
+    """
+    Runs jobs on a fixed number of worker tasks inside each API process.
+    The worker count caps concurrent LLM work independently of HTTP traffic.
+
+    The queue is a Redis list and job records live in Redis, so any API
+    worker can pick up a job or report its status, and jobs still queued
+    when a process restarts are run by the next one. A job cancelled
+    mid-run at shutdown is put back at the head of the queue.
+    """
+
+    # BRPOP returns after this long with nothing queued; it must stay under the socket timeout
+    POLL_SECONDS = 1
+
+    def __init__(self, concurrency: int, queue_size: int, queue_key: str = "jobs:queue"):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_key = queue_key
+        self.store = RedisJobStore(settings.GUIDANCE_JOB_TTL_SECONDS)
+        self._workers = []
+
+    async def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, name: str, *args):
+        try:
+            # a few submits racing past the check can overshoot the bound slightly
+            if await async_redis_client.llen(self.queue_key) >= self.queue_size:
+                raise QueueFull(f"Job queue is full ({self.queue_size} pending)")
+            await async_redis_client.lpush(self.queue_key, json.dumps({"name": name, "args": list(args)}))
+        except RedisError as e:
+            raise JobBackendUnavailable(f"Could not queue job {name} ({e})")
+
+    async def _worker(self):
+        while True:
+            try:
+                item = await async_redis_client.brpop([self.queue_key], timeout=self.POLL_SECONDS)
+            except RedisError as e:
+                logger.warning("Could not read the job queue (%s); retrying", e)
+                await asyncio.sleep(self.POLL_SECONDS)
+                continue
+            if item is None:
+                continue
+
+            job = json.loads(item[1])
+            try:
+                await JOBS[job["name"]](*job["args"])
+            except asyncio.CancelledError:
+                await async_redis_client.rpush(self.queue_key, item[1])
+                raise
+            except Exception:
+                logger.exception("Background job %s failed", job["name"])
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "asyncio",
+            "workers": len(self._workers),
+            "pending": await async_redis_client.llen(self.queue_key),
+        }
+
+
+class CeleryJobBackend:
+    """Hands jobs to Celery workers started with `celery -A app.jobs.celery_app worker`."""
+
+    def __init__(self):
+        from kombu.exceptions import OperationalError
+        from app.jobs.celery_app import celery_app
+        self.celery_app = celery_app
+        self.publish_errors = (OperationalError, RedisError)
+        self.store = RedisJobStore(settings.GUIDANCE_JOB_TTL_SECONDS)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def submit(self, name: str, *args):
+        # publishing is a blocking broker round-trip, retried while the broker is down
+        try:
+            await run_in_threadpool(self.celery_app.send_task, name, args=list(args))
+        except self.publish_errors as e:
+            raise JobBackendUnavailable(f"Could not publish job {name} ({e})")
+
+    async def stats(self) -> dict:
+        return {"backend": "celery"}
+
+
+_backend = None
+
+
+def get_job_backend():
+    global _backend
+    if _backend is None:
+        if settings.GUIDANCE_JOB_BACKEND == "celery":
+            _backend = CeleryJobBackend()
+        else:
+            _backend = AsyncioJobBackend(
+                settings.GUIDANCE_JOB_CONCURRENCY,
+                settings.GUIDANCE_JOB_QUEUE_SIZE,
+            )
+    return _backend
@@ -1,4 +1,7 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 # from app.routes.ChatBotRoutes import router as farmer_route  
@@ -12,23 +15,67 @@ from app.routes.user import router as UserRouter
 # from app.index.chatbot_index import run_conversation_stream
 from app.routes.CropPrediction import router as CropPrediction
 from app.routes.CropGuidance import router as CropGuidance
+from app.routes.Metrics import router as MetricsRouter
+from app.utils.gemini_client import close_clients
+from app.utils.compression import CompressionMiddleware
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.database.database import shutdown_database, shutdown_async_database
+from app.jobs.queue import get_job_backend
+from app.ml.registry import registry
+from app.utils.passwords import password_hasher, bulk_password_hasher, PasswordHasherBusy
+from app.config import settings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.MODEL_WARMUP:
+        await run_in_threadpool(registry.warm_up)
+    job_backend = get_job_backend()
+    await job_backend.start()
+    yield
+    await job_backend.stop()
+    password_hasher.shutdown()
+    bulk_password_hasher.shutdown()
+    await close_clients()
+    shutdown_database()
+    await shutdown_async_database()
 
 app = FastAPI(
     title="KisanMitra",
     description="Backend for KisanMitra",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins in progress, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # the next-page cursor of paginated lists; browsers hide other headers cross-origin
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 # init_db()
 
 # app.include_router(farmer_route)
@@ -46,6 +93,8 @@ app.include_router(FeedbackRouter)
 
 app.include_router(CropGuidance)
 
+app.include_router(MetricsRouter)
+
 # @app.websocket("/ws/{user_id}/{session_id}")
 # async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: str):
 #     await websocket.accept()
@@ -0,0 +1,93 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import numpy as np
+from typing import Dict, Tuple
+
+MAGIC = b"KMARRAY\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, format version, header length
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray], meta: dict):
+    """
+    Writes named arrays as one flat file: a JSON header describing dtype,
+    shape and offset of every array, then the raw buffers,
+    each aligned to 64 bytes so they can be memory-mapped in place.
+    The file is written to a temp name and renamed, so readers never see
+    a half-written bundle.
+    """
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_arrays(path: str, mmap_mode: bool = True) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    Reads a bundle written by `save_arrays`. With mmap_mode the arrays are
+    read-only views over a shared file mapping, so every worker process on
+    the box uses the same physical pages.
+    """
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a model array bundle")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has bundle format {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len))
+
+        if mmap_mode:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+
+    data_start = _align(_PREAMBLE.size + header_len)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+
+    return arrays, header["meta"]
+
+
+def read_meta(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return {}
+        return json.loads(f.read(header_len))["meta"]
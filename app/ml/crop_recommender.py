@@ -0,0 +1,142 @@
+import pickle
+import numpy as np
+from typing import List, Optional
+from schema import CropRequest
+from app.config import settings
+from app.ml.trees import FlatTreeEnsemble
+from app.ml.registry import registry, load_compiled
+
+FEATURES = ["Nitrogen", "Phosphorus", "Potassium", "Temperature", "Humidity", "Ph", "Rainfall"]
+
+CROP_DICT = {1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 6: "Papaya", 7: "Orange",
+             8: "Apple", 9: "Muskmelon", 10: "Watermelon", 11: "Grapes", 12: "Mango", 13: "Banana",
+             14: "Pomegranate", 15: "Lentil", 16: "Blackgram", 17: "Mungbean", 18: "Mothbeans",
+             19: "Pigeonpeas", 20: "Kidneybeans", 21: "Chickpea", 22: "Coffee"}
+
+MODEL_PATH = 'app/Model/CropPrediction/model.pkl'
+STANDARD_SCALER_PATH = 'app/Model/CropPrediction/standscaler.pkl'
+MINMAX_SCALER_PATH = 'app/Model/CropPrediction/minmaxscaler.pkl'
+
+
+def load_sklearn_pipeline():
+    """The original pickled (minmax scaler, standard scaler, classifier)."""
+    ms = pickle.load(open(MINMAX_SCALER_PATH,'rb'))
+    sc = pickle.load(open(STANDARD_SCALER_PATH,'rb'))
+    model = pickle.load(open(MODEL_PATH,'rb'))
+    return ms, sc, model
+
+
+class CropRecommender:
+    """
+    The MinMaxScaler -> StandardScaler -> RandomForestClassifier pipeline
+    compiled into one affine transform and a flattened forest.
+    """
+
+    def __init__(self, scale: np.ndarray, offset: np.ndarray, forest: FlatTreeEnsemble, classes: np.ndarray):
+        self.scale = scale
+        self.offset = offset
+        self.forest = forest
+        self.classes = classes
+
+    @classmethod
+    def from_sklearn(cls, minmax, standard, classifier) -> "CropRecommender":
+        if minmax.clip:
+            raise ValueError("A clipping MinMaxScaler cannot be folded into an affine transform")
+
+        mean = standard.mean_ if standard.with_mean else 0.0
+        std = standard.scale_ if standard.with_std else 1.0
+
+        # ((x * s1 + m1) - mean) / std == x * (s1 / std) + (m1 - mean) / std
+        scale = np.asarray(minmax.scale_ / std, dtype=np.float64)
+        offset = np.asarray((minmax.min_ - mean) / std, dtype=np.float64)
+
+        forest = FlatTreeEnsemble.from_sklearn(classifier, normalize=True)
+        return cls(scale, offset, forest, np.asarray(classifier.classes_))
+
+    def to_arrays(self) -> dict:
+        return {
+            "scale": self.scale,
+            "offset": self.offset,
+            "classes": self.classes,
+            **self.forest.to_arrays(prefix="forest_"),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "CropRecommender":
+        forest = FlatTreeEnsemble.from_arrays(arrays, prefix="forest_")
+        return cls(arrays["scale"], arrays["offset"], forest, arrays["classes"])
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        return features * self.scale + self.offset
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.forest.predict_value(self.transform(features))
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(features), axis=1)]
+
+    def top_k(self, features: np.ndarray, k: int):
+        """The k most probable labels per row, best first, with their probabilities."""
+        return _top_k(self.classes, self.predict_proba(features), k)
+
+
+def _top_k(classes: np.ndarray, proba: np.ndarray, k: int):
+    # stable sort keeps the lowest class index first on ties, like argmax
+    order = np.argsort(-proba, axis=1, kind="stable")[:, :k]
+    return classes[order], np.take_along_axis(proba, order, axis=1)
+
+
+def _load_recommender() -> CropRecommender:
+    arrays = load_compiled(
+        "crop_recommender",
+        [MINMAX_SCALER_PATH, STANDARD_SCALER_PATH, MODEL_PATH],
+        lambda: CropRecommender.from_sklearn(*load_sklearn_pipeline()).to_arrays(),
+    )
+    return CropRecommender.from_arrays(arrays)
+
+
+registry.register("crop.recommender", _load_recommender)
+# only unpickled once a batch big enough for sklearn's per-tree C loop arrives
+registry.register("crop.sklearn", load_sklearn_pipeline, eager=False)
+
+
+def features_matrix(requests: List[CropRequest]) -> np.ndarray:
+    """(N, 7) float matrix in the column order the scalers were fitted on."""
+    return np.array(
+        [[getattr(request, name) for name in FEATURES] for request in requests],
+        dtype=np.float64
+    )
+
+
+def predict_proba(features: np.ndarray):
+    """
+    Class labels and per-row probabilities from one pass over all rows.
+    The flattened forest wins on the small batches the API mostly sees;
+    above CROP_FLAT_FOREST_MAX_ROWS the pickled sklearn pipeline is faster.
+    """
+    if len(features) > settings.CROP_FLAT_FOREST_MAX_ROWS:
+        ms, sc, model = registry.get("crop.sklearn")
+        return model.classes_, model.predict_proba(sc.transform(ms.transform(features)))
+    recommender = registry.get("crop.recommender")
+    return recommender.classes, recommender.predict_proba(features)
+
+
+def predict_labels(features: np.ndarray) -> np.ndarray:
+    classes, proba = predict_proba(features)
+    return classes[np.argmax(proba, axis=1)]
+
+
+def rank_crops(features: np.ndarray, k: int) -> List[List[dict]]:
+    """Top-k candidates per row from a single forest pass."""
+    labels, proba = _top_k(*predict_proba(features), k)
+    return [
+        [
+            {"label": int(label), "crop": crop_name(label), "probability": round(float(p), 4)}
+            for label, p in zip(row_labels, row_proba)
+        ]
+        for row_labels, row_proba in zip(labels, proba)
+    ]
+
+
+def crop_name(label) -> Optional[str]:
+    return CROP_DICT.get(int(label))
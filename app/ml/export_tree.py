@@ -0,0 +1,47 @@
+"""
+Exports the pickled yield DecisionTreeRegressor to a flat array bundle.
+
+    python -m app.ml.export_tree                 # write the bundle next to dtr.pkl
+    python -m app.ml.export_tree --output x.kma  # write it somewhere else
+
+Workers memory-map the bundle instead of unpickling the estimator;
+building it here ahead of a deploy saves the first worker from compiling
+it on its first prediction.
+"""
+import argparse
+import os
+import pickle
+from app.ml.bundle import save_arrays
+from app.ml.registry import compiled_path, file_digest
+from app.ml.trees import FlatTreeEnsemble
+from app.ml.yield_predictor import DTR_PATH
+
+
+def export(source: str = DTR_PATH, output: str = "") -> str:
+    dtr = pickle.load(open(source,'rb'))
+    flat = FlatTreeEnsemble.from_sklearn(dtr)
+    output = output or compiled_path("yield_dtr", os.path.dirname(source))
+
+    save_arrays(output, flat.to_arrays(), {
+        "name": "yield_dtr",
+        "source_sha256": file_digest(source),
+        "estimator": type(dtr).__name__,
+        "node_count": int(dtr.tree_.node_count),
+        "max_depth": int(dtr.tree_.max_depth),
+        "n_features": int(dtr.n_features_in_),
+    })
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DTR_PATH, help="pickled DecisionTreeRegressor")
+    parser.add_argument("--output", default="", help="bundle path (default: yield_dtr.kma in the model cache dir)")
+    args = parser.parse_args()
+
+    bundle = export(args.source, args.output)
+    print(f"wrote {bundle} ({os.path.getsize(bundle)} bytes, source {os.path.getsize(args.source)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
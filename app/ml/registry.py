@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.ml.bundle import load_arrays, read_meta, save_arrays
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def compiled_path(name: str, source_dir: str) -> str:
+    directory = settings.MODEL_CACHE_DIR or source_dir
+    return os.path.join(directory, f"{name}.kma")
+
+
+def load_compiled(
+    name: str,
+    sources: List[str],
+    compile_fn: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Returns the compiled arrays for `name`, memory-mapped from the bundle
+    next to the source pickles. The bundle is rebuilt from the pickles when
+    it is missing or was compiled from different pickle bytes; if it cannot
+    be written the freshly compiled in-memory arrays are used instead.
+    """
+    path = compiled_path(name, os.path.dirname(sources[0]))
+    source_hash = file_digest(*sources)
+
+    if os.path.exists(path) and read_meta(path).get("source_sha256") == source_hash:
+        arrays, _ = load_arrays(path, mmap_mode=True)
+        return arrays
+
+    arrays = compile_fn()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_arrays(path, arrays, {"name": name, "source_sha256": source_hash})
+    except OSError as e:
+        logger.warning("Could not write compiled model %s (%s); using in-memory copy", path, e)
+        return arrays
+
+    arrays, _ = load_arrays(path, mmap_mode=True)
+    return arrays
+
+
+class ModelRegistry:
+    """
+    Lazily loads model artifacts on first use (or all at once in `warm_up`)
+    and records how long each one took.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._eager: Dict[str, bool] = {}
+        self._models: Dict[str, Any] = {}
+        self._load_seconds: Dict[str, float] = {}
+        # reentrant so a loader can build on another registered model
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], eager: bool = True):
+        """eager=False leaves the model out of the default `warm_up`."""
+        self._loaders[name] = loader
+        self._eager[name] = eager
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._load_seconds[name] = time.perf_counter() - started
+                logger.info("Loaded model %s in %.3fs", name, self._load_seconds[name])
+            return self._models[name]
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        for name in names or [n for n in self._loaders if self._eager[n]]:
+            self.get(name)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": round(self._load_seconds[name], 4) if name in self._load_seconds else None,
+            }
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,155 @@
+import numpy as np
+
+TREE_LEAF = -1
+
+# below this many (row, tree) paths a plain Python walk beats per-level NumPy calls
+SCALAR_WALK_MAX_PATHS = 4
+
+
+class FlatTreeEnsemble:
+    """
+    One or more fitted sklearn decision trees flattened into parallel node
+    arrays (feature, threshold, left, right, value). Every tree's nodes are
+    stored back to back; `roots` holds the index of each tree's first node.
+
+    Evaluation walks all rows through all trees one level at a time with
+    NumPy fancy indexing, so there is no per-row Python and none of
+    sklearn's per-call input validation.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+        # Evaluation layout: children[2 * node + went_right] is the next node
+        # and leaves point to themselves, so one gather advances every path.
+        self._is_leaf = left == TREE_LEAF
+        nodes = np.arange(len(left), dtype=np.int32)
+        self._children = np.empty(2 * len(left), dtype=np.int32)
+        self._children[0::2] = np.where(self._is_leaf, nodes, left)
+        self._children[1::2] = np.where(self._is_leaf, nodes, right)
+
+    @classmethod
+    def from_sklearn(cls, estimator, normalize: bool = False) -> "FlatTreeEnsemble":
+        """
+        Accepts a DecisionTree* or a forest of them. With normalize=True each
+        leaf's class counts are turned into probabilities, as predict_proba does.
+        """
+        trees = [e.tree_ for e in getattr(estimator, "estimators_", [estimator])]
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            value = tree.value[:, 0, :].astype(np.float64)
+            if normalize:
+                totals = value.sum(axis=1, keepdims=True)
+                totals[totals == 0.0] = 1.0
+                value = value / totals
+
+            features.append(np.where(left == TREE_LEAF, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(left == TREE_LEAF, TREE_LEAF, left + offset).astype(np.int32))
+            rights.append(np.where(right == TREE_LEAF, TREE_LEAF, right + offset).astype(np.int32))
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=estimator.n_features_in_,
+        )
+
+    def to_arrays(self, prefix: str = "") -> dict:
+        return {
+            f"{prefix}feature": self.feature,
+            f"{prefix}threshold": self.threshold,
+            f"{prefix}left": self.left,
+            f"{prefix}right": self.right,
+            f"{prefix}value": self.value,
+            f"{prefix}roots": self.roots,
+            f"{prefix}shape": np.array([self.max_depth, self.n_features], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, prefix: str = "") -> "FlatTreeEnsemble":
+        max_depth, n_features = arrays[f"{prefix}shape"]
+        return cls(
+            feature=arrays[f"{prefix}feature"],
+            threshold=arrays[f"{prefix}threshold"],
+            left=arrays[f"{prefix}left"],
+            right=arrays[f"{prefix}right"],
+            value=arrays[f"{prefix}value"],
+            roots=arrays[f"{prefix}roots"],
+            max_depth=max_depth,
+            n_features=n_features,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by every row in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        if n_rows * self.n_trees <= SCALAR_WALK_MAX_PATHS:
+            return self._apply_scalar(X)
+        flat_X = X.ravel()
+
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.int32)
+        path = np.arange(n_rows * self.n_trees, dtype=np.int32)
+        node = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees)
+
+        done = self._is_leaf.take(node)
+        while True:
+            # paths that reached a leaf are written out and dropped, so later
+            # levels only touch the deeper branches
+            if done.any():
+                leaves[path[done]] = node[done]
+                active = ~done
+                path, node, row_start = path[active], node[active], row_start[active]
+            if not path.size:
+                break
+            x = flat_X.take(row_start + self.feature.take(node))
+            node = self._children.take(2 * node + (x > self.threshold.take(node)))
+            done = self._is_leaf.take(node)
+
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def _apply_scalar(self, X: np.ndarray) -> np.ndarray:
+        leaves = np.empty((len(X), self.n_trees), dtype=np.int32)
+        for r, row in enumerate(X.tolist()):
+            for t, node in enumerate(self.roots.tolist()):
+                while not self._is_leaf.item(node):
+                    went_right = row[self.feature.item(node)] > self.threshold.item(node)
+                    node = self._children.item(2 * node + went_right)
+                leaves[r, t] = node
+        return leaves
+
+    def predict_value(self, X: np.ndarray) -> np.ndarray:
+        """Leaf values averaged over the trees, shape (n_rows, n_outputs)."""
+        leaves = self.apply(X)
+        if leaves.shape[0] <= self.n_trees:
+            return self.value[leaves].mean(axis=1)
+
+        # for big batches, summing tree by tree avoids a (rows, trees, outputs) temporary
+        total = np.zeros((leaves.shape[0], self.value.shape[1]))
+        for t in range(self.n_trees):
+            total += self.value.take(leaves[:, t], axis=0)
+        return total / self.n_trees
@@ -0,0 +1,231 @@
+import pickle
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+from schema import YieldPredictionRequest
+from app.config import settings
+from app.ml.trees import FlatTreeEnsemble
+from app.ml.registry import registry, load_compiled
+
+DTR_PATH = 'app/Model/YeildPrediction/dtr.pkl'
+PREPROCESSOR_PATH = 'app/Model/YeildPrediction/preprocessor.pkl'
+
+# column order the preprocessor was fitted on
+COLUMNS = ["Year", "average_rain_fall_mm_per_year", "pesticides_tonnes", "avg_temp", "Area", "Item"]
+NUMERIC_COLUMNS = COLUMNS[:4]
+
+def load_sklearn_dtr():
+    """The original pickled DecisionTreeRegressor."""
+    return pickle.load(open(DTR_PATH,'rb'))
+
+
+def load_preprocessor():
+    """The original pickled ColumnTransformer."""
+    return pickle.load(open(PREPROCESSOR_PATH,'rb'))
+
+
+def _load_dtr() -> FlatTreeEnsemble:
+    arrays = load_compiled(
+        "yield_dtr",
+        [DTR_PATH],
+        lambda: FlatTreeEnsemble.from_sklearn(load_sklearn_dtr()).to_arrays(),
+    )
+    return FlatTreeEnsemble.from_arrays(arrays)
+
+
+registry.register("yield.dtr", _load_dtr)
+# the pickles are only the source of the bundles; they are unpickled for
+# batches big enough for sklearn's tree walker, or to report an unknown category
+registry.register("yield.sklearn", load_sklearn_dtr, eager=False)
+registry.register("yield.preprocessor", load_preprocessor, eager=False)
+
+
+class YieldEncoder:
+    """
+    Fast path for the fitted ColumnTransformer (StandardScaler on the four
+    numeric columns, OneHotEncoder(drop='first') on Area and Item).
+
+    The categorical part of the output only depends on the (Area, Item)
+    pair, so the encoded block for every known pair is built once when the
+    bundle is compiled. Encoding a row is then the scaler arithmetic plus
+    one row lookup. Batches containing an unknown pair go through the
+    original transformer, which raises exactly as before.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, pair_blocks: np.ndarray, areas: np.ndarray, items: np.ndarray):
+        self.mean = mean
+        self.scale = scale
+        self.pair_blocks = pair_blocks
+        self.areas = areas
+        self.items = items
+        self.pair_index = {
+            (area, item): i * len(items) + j
+            for i, area in enumerate(areas.tolist()) for j, item in enumerate(items.tolist())
+        }
+
+    @classmethod
+    def from_sklearn(cls, preprocessor) -> "YieldEncoder":
+        scaler = preprocessor.named_transformers_["StandardScale"]
+        encoder = preprocessor.named_transformers_["OHE"]
+
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(NUMERIC_COLUMNS))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(NUMERIC_COLUMNS))
+
+        # one-hot block of every category of each column, minus the dropped column
+        blocks = []
+        for categories, drop in zip(encoder.categories_, encoder.drop_idx_):
+            block = np.eye(len(categories))
+            if drop is not None:
+                block = np.delete(block, drop, axis=1)
+            blocks.append(block)
+        area_block, item_block = blocks
+        areas, items = encoder.categories_
+
+        pair_blocks = np.hstack([
+            np.repeat(area_block, len(items), axis=0),
+            np.tile(item_block, (len(areas), 1)),
+        ])
+        return cls(
+            np.asarray(mean, dtype=np.float64),
+            np.asarray(scale, dtype=np.float64),
+            pair_blocks,
+            np.asarray(areas, dtype=str),
+            np.asarray(items, dtype=str),
+        )
+
+    def to_arrays(self) -> dict:
+        return {
+            "mean": self.mean,
+            "scale": self.scale,
+            "pair_blocks": self.pair_blocks,
+            "areas": self.areas,
+            "items": self.items,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "YieldEncoder":
+        return cls(arrays["mean"], arrays["scale"], arrays["pair_blocks"], arrays["areas"], arrays["items"])
+
+    def transform(self, features) -> np.ndarray:
+        """Dense (n_rows, n_outputs) equivalent of `preprocessor.transform`."""
+        if isinstance(features, pd.DataFrame):
+            features = features[COLUMNS].to_numpy(dtype=object)
+
+        rows = []
+        for area, item in features[:, 4:6]:
+            row = self.pair_index.get((area, item))
+            if row is None:
+                return registry.get("yield.preprocessor").transform(_as_frame(features))
+            rows.append(row)
+
+        numeric = features[:, :4].astype(np.float64)
+        out = np.empty((len(features), len(NUMERIC_COLUMNS) + self.pair_blocks.shape[1]))
+        out[:, :4] = (numeric - self.mean) / self.scale
+        out[:, 4:] = self.pair_blocks[rows]
+        return out
+
+
+def _as_frame(features: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame(features, columns=COLUMNS)
+
+
+def _load_encoder() -> YieldEncoder:
+    arrays = load_compiled(
+        "yield_encoder",
+        [PREPROCESSOR_PATH],
+        lambda: YieldEncoder.from_sklearn(load_preprocessor()).to_arrays(),
+    )
+    return YieldEncoder.from_arrays(arrays)
+
+
+registry.register("yield.encoder", _load_encoder)
+
+
+def features_row(request: YieldPredictionRequest) -> np.ndarray:
+    """One raw feature row in the column order the preprocessor was fitted on."""
+    return np.array([[
+        request.Year,
+        request.average_rain_fall_mm_per_year,
+        request.pesticides_tonnes,
+        request.avg_temp,
+        request.Area,
+        request.Item
+    ]], dtype=object)
+
+
+def predict(features) -> np.ndarray:
+    """
+    Yields for raw feature rows. The flat tree walks a handful of rows
+    faster than sklearn; above YIELD_FLAT_TREE_MAX_ROWS the pickled
+    regressor's Cython walker wins at this tree's depth.
+    """
+    transformed_features = registry.get("yield.encoder").transform(features)
+    if len(transformed_features) > settings.YIELD_FLAT_TREE_MAX_ROWS:
+        return registry.get("yield.sklearn").predict(transformed_features)
+    return registry.get("yield.dtr").predict_value(transformed_features)[:, 0]
+
+
+def known_categories() -> Tuple[set, set]:
+    """The Area and Item values the one-hot encoder was fitted on."""
+    encoder = registry.get("yield.encoder")
+    return set(encoder.areas.tolist()), set(encoder.items.tolist())
+
+
+def predict_frame(frame: pd.DataFrame) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Validates a chunk of raw rows and predicts every valid one in a single
+    transform/predict pass. Returns the predictions (NaN for rejected rows)
+    and a per-row error message, None where the row was accepted.
+    """
+    numeric = frame[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    area = frame["Area"].astype("string").str.strip()
+    item = frame["Item"].astype("string").str.strip()
+    areas, items = known_categories()
+
+    errors: List[Optional[str]] = [None] * len(frame)
+    bad_numeric = numeric.isna().any(axis=1).to_numpy()
+    unknown_area = ~area.isin(areas).to_numpy()
+    unknown_item = ~item.isin(items).to_numpy()
+    for i in np.flatnonzero(bad_numeric | unknown_area | unknown_item):
+        if bad_numeric[i]:
+            missing = [c for c in NUMERIC_COLUMNS if pd.isna(numeric.iloc[i][c])]
+            errors[i] = f"Missing or non-numeric value for {', '.join(missing)}"
+        else:
+            column, value = ("Area", area.iloc[i]) if unknown_area[i] else ("Item", item.iloc[i])
+            errors[i] = f"Missing value for {column}" if pd.isna(value) else f"Unknown {column} '{value}'"
+
+    predictions = np.full(len(frame), np.nan)
+    valid = ~(bad_numeric | unknown_area | unknown_item)
+    if valid.any():
+        rows = numeric[valid].assign(Area=area[valid].to_numpy(dtype=object), Item=item[valid].to_numpy(dtype=object))
+        predictions[valid] = predict(rows[COLUMNS])
+    return predictions, errors
+
+
+def sweep_axes(base: YieldPredictionRequest, ranges: dict) -> dict:
+    """
+    Values for each numeric column: the swept range where one is given,
+    otherwise just the base value. Years are rounded to whole, distinct years.
+    """
+    axes = {}
+    for column in NUMERIC_COLUMNS:
+        sweep = ranges.get(column)
+        if sweep is None:
+            axes[column] = np.array([getattr(base, column)], dtype=np.float64)
+        elif column == "Year":
+            axes[column] = np.unique(np.round(np.linspace(sweep.start, sweep.stop, sweep.steps)))
+        else:
+            axes[column] = np.linspace(sweep.start, sweep.stop, sweep.steps)
+    return axes
+
+
+def predict_grid(axes: dict, area: str, item: str) -> np.ndarray:
+    """
+    Predicts the full Cartesian product of the axes in one pass and returns
+    the yields shaped (len(Year), len(rainfall), len(pesticides), len(temp)).
+    """
+    mesh = np.meshgrid(*[axes[column] for column in NUMERIC_COLUMNS], indexing="ij")
+    frame = pd.DataFrame({column: grid.ravel() for column, grid in zip(NUMERIC_COLUMNS, mesh)})
+    frame["Area"] = area
+    frame["Item"] = item
+    return predict(frame[COLUMNS]).reshape(mesh[0].shape)
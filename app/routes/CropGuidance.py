@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from schema import CropGuidanceResponse, CropFormRequest
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from schema import CropGuidanceResponse, CropFormRequest, CropGuidanceOut
 from dotenv import load_dotenv
 import os
-from geminiResponse import call_gemini_for_guidance
+import uuid
+from typing import List, Literal
+import json
+from geminiResponse import acall_gemini_for_guidance, astream_gemini_for_guidance
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, SessionLocal
 from app.Tables.CropGuidance import CropGuidances
+from app.Tables.GuidanceBlobs import GuidanceBlob
 from app.Tables.UserTable import User
 from app.utils.auth import get_current_user
+from app.utils.pagination import PageParams, page_params, keyset, split_page, set_next_cursor
+from app.utils.compression import accepts_gzip, deflate_segment, gzip_from_segments
+from app.config import settings
+from app.jobs.guidance import save_guidance, enqueue_guidance
+from app.jobs.queue import get_job_backend, QueueFull, JobBackendUnavailable
 
 load_dotenv()
 
@@ -19,7 +30,7 @@ router = APIRouter(
 )
 
 @router.post("/getting_guidance")
-def give_guidance(
+async def give_guidance(
     crop_data: CropFormRequest, 
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -29,49 +40,203 @@ def give_guidance(
     and returns ultra-detailed crop guidance.
     """
     try:
-        guidance = call_gemini_for_guidance(crop_data, api_key=api_key)
-
-        db_entry = CropGuidances(
-            user_id=current_user.id, #type:ignore
-            crop_name=crop_data.crop,
-            land_size=crop_data.land_size, #type:ignore
-            soil_type=crop_data.soil_type,  #type:ignore
-            location=crop_data.location,
-            irrigation_method=crop_data.irrigation,
-            fertilizer={
-                "type": crop_data.fertilizer.type,  #type:ignore
-                "amount": crop_data.fertilizer.amount,  #type:ignore
-                "schedule": crop_data.fertilizer.schedule  #type:ignore
-            },
-            equipment=crop_data.equipment, 
-            planting_date=crop_data.planting_date or None, #type:ignore
-            growing_season=crop_data.growing_season,  #type:ignore
-            guidance_response=guidance
-        )
-        db.add(db_entry)
-        db.commit()
-        db.refresh(db_entry)
+        guidance = await acall_gemini_for_guidance(crop_data, api_key=api_key)
+
+        await run_in_threadpool(save_guidance, db, current_user.id, crop_data, guidance) #type:ignore
 
-        from fastapi.responses import JSONResponse
-        return JSONResponse(content={"guidance": guidance})
+        return ORJSONResponse(content={"guidance": guidance})
 
     except Exception as e:
-        from fastapi.responses import JSONResponse
-        return JSONResponse(status_code=500, content={"detail": str(e)})
+        return ORJSONResponse(status_code=500, content={"detail": str(e)})
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _persist_streamed_guidance(user_id: int, crop_data: CropFormRequest, guidance: dict) -> int:
+    db = SessionLocal()
+    try:
+        return save_guidance(db, user_id, crop_data, guidance).id #type:ignore
+    finally:
+        db.close()
+
+
+@router.post("/stream")
+async def stream_guidance(
+    crop_data: CropFormRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Same guidance as /getting_guidance, streamed as Server-Sent Events.
+    Each top-level section is sent as a `section` event as soon as Gemini
+    completes it; a final `done` event carries the stored guidance id.
+    """
+    user_id = current_user.id #type:ignore
+
+    async def events():
+        guidance = {}
+        try:
+            async for key, value in astream_gemini_for_guidance(crop_data, api_key=api_key):
+                guidance[key] = value
+                yield _sse("section", {"key": key, "value": value})
+
+            guidance_id = await run_in_threadpool(_persist_streamed_guidance, user_id, crop_data, guidance)
+            yield _sse("done", {"guidance_id": guidance_id})
+
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+SUMMARY_COLUMNS = (
+    CropGuidances.id,
+    CropGuidances.crop_name,
+    CropGuidances.location,
+    CropGuidances.growing_season,
+    GuidanceBlob.summary,
+    CropGuidances.created_at,
+)
+
+# the row's own columns plus its stored guidance bytes
+STORED_COLUMNS = (
+    *(c for c in CropGuidances.__table__.columns if c.key != "guidance_sha256"),
+    GuidanceBlob.content,
+)
+
+
+def _guidance_query(db: Session, view: str, stored: bool):
+    if view == "summary":
+        columns = SUMMARY_COLUMNS
+    elif stored:
+        columns = STORED_COLUMNS
+    else:
+        return db.query(CropGuidances)
+    return db.query(*columns).join(GuidanceBlob, CropGuidances.guidance_sha256 == GuidanceBlob.sha256)
+
+
+def _stored_guidance_response(rows, many: bool) -> Response:
+    """
+    Builds the gzip body from each row's stored guidance segment plus small
+    freshly compressed pieces for the surrounding JSON, so the guidance
+    text itself is never recompressed on read.
+    """
+    segments, pending = [], b"[" if many else b""
+    for i, row in enumerate(rows):
+        meta = CropGuidanceOut.model_validate(row).model_dump_json(
+            exclude={"guidance_response"}, exclude_unset=True
+        ).encode("utf-8")
+        pending += (b"," if i else b"") + meta[:-1] + b',"guidance_response":'
+        segments.append(deflate_segment(pending, settings.COMPRESSION_GZIP_LEVEL))
+        segments.append(row.content)
+        pending = b"}"
+    segments.append(deflate_segment(pending + (b"]" if many else b""), settings.COMPRESSION_GZIP_LEVEL))
+
+    return Response(
+        content=gzip_from_segments(segments),
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+    )
+
 
-@router.get("/user_guidance")
+@router.get("/user_guidance", response_model=List[CropGuidanceOut], response_model_exclude_unset=True)
 def getting_guidance(
+    request: Request,
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Getting the guidances which a specific user has taken"""
-
-    guidances = db.query(CropGuidances).filter(
+    """
+    Getting the guidances which a specific user has taken, newest first.
+    The cursor for the next page is sent in the X-Next-Cursor header.
+    view=summary returns only the guidance summary instead of the whole
+    guidance_response; fetch that with /user_guidance/{id}.
+    Clients accepting gzip get the stored, pre-compressed guidance.
+    """
+    stored = view == "full" and accepts_gzip(request.headers.get("accept-encoding"))
+    guidances, next_cursor = split_page(keyset(_guidance_query(db, view, stored).filter(
         CropGuidances.user_id == current_user.id #type:ignore
-    ).all()
+    ), CropGuidances, page).all(), page)
+
+    if stored:
+        stored_response = _stored_guidance_response(guidances, many=True)
+        set_next_cursor(stored_response, next_cursor)
+        return stored_response
 
-    if not guidances:
-        return []
-        
+    set_next_cursor(response, next_cursor)
     return guidances
 
+
+@router.get("/user_guidance/{guidance_id}", response_model=CropGuidanceOut, response_model_exclude_unset=True)
+def getting_single_guidance(
+    guidance_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """One guidance of the logged-in user, including the full guidance_response"""
+    stored = accepts_gzip(request.headers.get("accept-encoding"))
+    guidance = _guidance_query(db, "full", stored).filter(
+        CropGuidances.id == guidance_id,
+        CropGuidances.user_id == current_user.id #type:ignore
+    ).first()
+
+    if not guidance:
+        raise HTTPException(status_code=404, detail="Guidance not found")
+
+    if stored:
+        return _stored_guidance_response([guidance], many=False)
+
+    return guidance
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_guidance_job(
+    crop_data: CropFormRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Queues guidance generation and returns a job id straight away.
+    Poll /crop_guidance/jobs/{job_id}; a notification is also created when it finishes.
+    """
+    job_id = uuid.uuid4().hex
+    try:
+        record = await enqueue_guidance(job_id, current_user.id, crop_data) #type:ignore
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Guidance queue is full, please retry shortly")
+    except JobBackendUnavailable:
+        raise HTTPException(
+            status_code=503,
+            detail="Guidance jobs are unavailable, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    return {
+        "job_id": job_id,
+        "status": record["status"],
+        "status_url": f"/crop_guidance/jobs/{job_id}"
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_guidance_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Status of a queued guidance job, with the guidance once it is done"""
+    record = await get_job_backend().store.get(job_id)
+    if not record or record.get("user_id") != current_user.id: #type:ignore
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if record["status"] == "done":
+        entry = await run_in_threadpool(db.get, CropGuidances, record["guidance_id"])
+        record["guidance"] = entry.guidance_response if entry else None
+
+    return record
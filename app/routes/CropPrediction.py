@@ -1,20 +1,23 @@
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from schema import CropRequest
+from schema import CropRequest, CropBatchRequest, RecommendationOut, RecommendationPage
 import numpy as np
+import asyncio
+from typing import Literal
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
-from geminiResponse import call_gemini
-import pickle
-from app.database.database import get_db
+from geminiResponse import acall_gemini, acall_gemini_candidates
+from app.config import settings
+from app.database.database import get_db, checkout_within, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.utils.auth import get_current_user
+from app.utils.pagination import PageParams, page_params, keyset, split_page, set_next_cursor
 import json
 from app.Tables.CropRecommendations import CropRecommendation
-
-model = pickle.load(open('app/Model/CropPrediction/model.pkl','rb'))
-sc = pickle.load(open('app/Model/CropPrediction/standscaler.pkl','rb'))
-ms = pickle.load(open('app/Model/CropPrediction/minmaxscaler.pkl','rb'))
+from app.ml.crop_recommender import CROP_DICT, features_matrix, predict_labels, rank_crops, crop_name
 
 load_dotenv()
 
@@ -25,15 +28,50 @@ router = APIRouter(
     tags = ['Crop Recommendation']
 )
 
+def _recommendation_row(user_id: int, response: dict) -> CropRecommendation:
+    return CropRecommendation(
+        user_id=user_id,
+        predicted_crop=response["predicted_crop"],
+        suitability_score=str(response.get("suitability_score")),
+        best_planting_time=response.get("best_planting_time"),
+        harvest_period=response.get("harvest_period"),
+        water_requirements=response.get("water_requirements"),
+        fertilizer_recommendations=response.get("fertilizer_recommendations"),
+        soil_condition=response.get("soil_condition"),
+        expected_yield=response.get("expected_yield"),
+        expected_market_price=response.get("expected_market_price"),
+        risk_factors=json.dumps(response.get("risk_factors")),  
+        summary=response.get("summary"),
+    )
+
+
+def _save_recommendation(db: Session, user_id: int, response: dict):
+    # the wait budget applies here, after Gemini, so no connection is held while it answers
+    checkout_within(db)
+    new_recommendation = _recommendation_row(user_id, response)
+
+    db.add(new_recommendation)
+    db.commit()
+    db.refresh(new_recommendation)
+
+    return new_recommendation
+
+
 @router.post("/predict")
-def predict(
+async def predict(
     request: CropRequest,
+    top_k: int = Query(1, ge=1, le=len(CROP_DICT)),
+    enrich: Literal["top", "all"] = "top",
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)  
 ):
     """
-        Endpoint for predicting the best crop according to varoious factors
+        Endpoint for predicting the best crop according to varoious factors.
+        With top_k > 1 the response also lists the `candidates` ranked by model
+        probability; enrich=all asks Gemini about every candidate in one call.
     """
+    if top_k > 1:
+        return await _predict_ranked(request, top_k, enrich, db, current_user)
 
     N = request.Nitrogen
     P = request.Phosphorus
@@ -43,20 +81,11 @@ def predict(
     ph = request.Ph
     rainfall = request.Rainfall
 
-    feature_list = [N, P, K, temp, humidity, ph, rainfall]
-    single_pred = np.array(feature_list).reshape(1, -1)
+    # off the event loop: the first call on a worker may still load the model
+    prediction = await run_in_threadpool(predict_labels, features_matrix([request]))
 
-    scaled_features = ms.transform(single_pred)
-    final_features = sc.transform(scaled_features)
-    prediction = model.predict(final_features)
-
-    crop_dict = {1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 6: "Papaya", 7: "Orange",
-                 8: "Apple", 9: "Muskmelon", 10: "Watermelon", 11: "Grapes", 12: "Mango", 13: "Banana",
-                 14: "Pomegranate", 15: "Lentil", 16: "Blackgram", 17: "Mungbean", 18: "Mothbeans",
-                 19: "Pigeonpeas", 20: "Kidneybeans", 21: "Chickpea", 22: "Coffee"}
-    
-    if prediction[0] in crop_dict:
-        crop = crop_dict[prediction[0]]
+    if prediction[0] in CROP_DICT:
+        crop = CROP_DICT[prediction[0]]
         result = "{} is the best crop to be cultivated right there".format(crop)
     else:
         result = "Sorry, we could not determine the best crop to be cultivated with the provided data."
@@ -72,58 +101,136 @@ def predict(
         "crop": crop
     }
     
-    response = call_gemini(CropMidResponse, api_key)
-
-    new_recommendation = CropRecommendation(
-        user_id=current_user.id, #type:ignore
-        predicted_crop=response["predicted_crop"],
-        suitability_score=str(response.get("suitability_score")),
-        best_planting_time=response.get("best_planting_time"),
-        harvest_period=response.get("harvest_period"),
-        water_requirements=response.get("water_requirements"),
-        fertilizer_recommendations=response.get("fertilizer_recommendations"),
-        soil_condition=response.get("soil_condition"),
-        expected_yield=response.get("expected_yield"),
-        expected_market_price=response.get("expected_market_price"),
-        risk_factors=json.dumps(response.get("risk_factors")),  
-        summary=response.get("summary"),
-    )
+    response = await acall_gemini(CropMidResponse, api_key)
 
-    db.add(new_recommendation)
-    db.commit()
-    db.refresh(new_recommendation)
+    await run_in_threadpool(_save_recommendation, db, current_user.id, response) #type:ignore
 
     return response
 
 
-@router.get("/recommendations")
-def get_user_recommendations(
+async def _predict_ranked(request: CropRequest, top_k: int, enrich: str, db: Session, current_user):
+    """Top-k candidates from one probability pass; the best one is enriched and stored."""
+    candidates = (await run_in_threadpool(rank_crops, features_matrix([request]), top_k))[0]
+    candidates = [c for c in candidates if c["crop"] is not None]
+    if not candidates:
+        raise HTTPException(status_code=422, detail="Could not determine a crop for the provided data")
+
+    soil_data = request.dict()
+    if enrich == "all":
+        try:
+            candidates = await acall_gemini_candidates(soil_data, candidates, api_key)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        best = {k: v for k, v in candidates[0].items() if k not in ("label", "crop", "probability")}
+    else:
+        best = await acall_gemini({**soil_data, "crop": candidates[0]["crop"]}, api_key)
+
+    if "error" not in best:
+        await run_in_threadpool(_save_recommendation, db, current_user.id, best) #type:ignore
+
+    return {**best, "candidates": candidates}
+
+
+def _save_recommendations(db: Session, user_id: int, responses: list):
+    db.add_all([_recommendation_row(user_id, response) for response in responses])
+    db.commit()
+
+
+@router.post("/predict_batch")
+async def predict_batch(
+    request: CropBatchRequest,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Scores many soil samples with a single scaler/model pass.
+    With enrich=true each predicted crop is also sent to Gemini, with a
+    bounded number of calls in flight, and the enriched results are stored.
+    """
+    if len(request.samples) > settings.CROP_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.CROP_BATCH_MAX_ROWS} samples per batch"
+        )
+
+    features = features_matrix(request.samples)
+    labels = await run_in_threadpool(predict_labels, features)
+
+    results = [
+        {"index": i, "label": int(label), "crop": crop_name(label)}
+        for i, label in enumerate(labels)
+    ]
+
+    if request.enrich:
+        semaphore = asyncio.Semaphore(settings.GEMINI_BATCH_CONCURRENCY)
+
+        async def enrich(result: dict, sample: CropRequest):
+            if result["crop"] is None:
+                return
+            async with semaphore:
+                try:
+                    result["enrichment"] = await acall_gemini({**sample.dict(), "crop": result["crop"]}, api_key)
+                except Exception as e:
+                    result["error"] = str(e)
+
+        await asyncio.gather(*[enrich(result, sample) for result, sample in zip(results, request.samples)])
+
+        enriched = [r["enrichment"] for r in results if "enrichment" in r and "error" not in r["enrichment"]]
+        if enriched:
+            await run_in_threadpool(_save_recommendations, db, current_user.id, enriched) #type:ignore
+
+    return {"count": len(results), "results": results}
+
+
+SUMMARY_COLUMNS = (
+    CropRecommendation.id,
+    CropRecommendation.predicted_crop,
+    CropRecommendation.suitability_score,
+    CropRecommendation.summary,
+    CropRecommendation.created_at,
+)
+
+
+@router.get("/recommendations", response_model=RecommendationPage, response_model_exclude_unset=True)
+async def get_user_recommendations(
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)  
 ):
     """
-    Get all crop recommendations of the logged-in user
+    Crop recommendations of the logged-in user, newest first.
+    The cursor for the next page is sent in the X-Next-Cursor header.
+    view=summary only reads id, crop, score, summary and created_at;
+    fetch the rest with /recommendations/{id}.
     """
-    recommendations = db.query(CropRecommendation).filter(
+    columns = SUMMARY_COLUMNS if view == "summary" else (CropRecommendation,)
+    stmt = keyset(select(*columns).where(
         CropRecommendation.user_id == current_user.id  # type: ignore
-    ).all()
-
-    results = []
-    for rec in recommendations:
-        results.append({
-            "id": rec.id,
-            "predicted_crop": rec.predicted_crop,
-            "suitability_score": rec.suitability_score,
-            "best_planting_time": rec.best_planting_time,
-            "harvest_period": rec.harvest_period,
-            "water_requirements": rec.water_requirements,
-            "fertilizer_recommendations": rec.fertilizer_recommendations,
-            "soil_condition": rec.soil_condition,
-            "expected_yield": rec.expected_yield,
-            "expected_market_price": rec.expected_market_price,
-            "risk_factors": json.loads(rec.risk_factors) if rec.risk_factors else [], #type:ignore
-            "summary": rec.summary,
-            "created_at": rec.created_at.isoformat() if rec.created_at else None #type:ignore
-        })
-
-    return {"recommendations": results}
+    ), CropRecommendation, page)
+    result = await db.execute(stmt)
+    recommendations, next_cursor = split_page(
+        result.all() if view == "summary" else result.scalars().all(), page
+    )
+
+    set_next_cursor(response, next_cursor)
+    return {"recommendations": recommendations}
+
+
+@router.get("/recommendations/{recommendation_id}", response_model=RecommendationOut)
+async def get_user_recommendation(
+    recommendation_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """One crop recommendation of the logged-in user with all its fields"""
+    rec = (await db.execute(select(CropRecommendation).where(
+        CropRecommendation.id == recommendation_id,
+        CropRecommendation.user_id == current_user.id  # type: ignore
+    ))).scalar_one_or_none()
+
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+
+    return rec
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from datetime import datetime
-from app.database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime, timezone
+from app.database.database import get_db, get_async_db
 from app.Tables.Feedbacks import Feedback
 from app.utils.auth import get_current_user
-from schema import FeedbackCreate
+from app.utils.pagination import PageParams, page_params, keyset, split_page, set_next_cursor
+from schema import FeedbackCreate, FeedbackPage
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -13,9 +16,9 @@ router = APIRouter(
 )
 
 @router.post("/add_feedback", status_code=status.HTTP_201_CREATED)
-def create_feedback(
+async def create_feedback(
     feedback: FeedbackCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user),
 ):
     if feedback.rating < 1 or feedback.rating > 5:
@@ -28,22 +31,27 @@ def create_feedback(
         rating=feedback.rating,
         category=feedback.category,
         comment=feedback.comment,
-        created_at=datetime.utcnow(),
+        created_at=datetime.now(timezone.utc),
     )
     db.add(new_feedback)
-    db.commit()
-    db.refresh(new_feedback)
+    await db.commit()
+    await db.refresh(new_feedback)
 
     return {"message": "Feedback submitted successfully", "feedback": new_feedback}
 
-@router.get("/my_feedbacks", status_code=status.HTTP_200_OK)
-def get_my_feedbacks(
-    db: Session = Depends(get_db),
+@router.get("/my_feedbacks", status_code=status.HTTP_200_OK, response_model=FeedbackPage, response_model_exclude_unset=True)
+async def get_my_feedbacks(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user),
 ):
-    feedbacks = db.query(Feedback).filter(Feedback.user_id == current_user.id).all() #type:ignore
+    """Newest first; the cursor for the next page is sent in the X-Next-Cursor header"""
+    stmt = keyset(select(Feedback).where(Feedback.user_id == current_user.id), Feedback, page) #type:ignore
+    feedbacks, next_cursor = split_page((await db.execute(stmt)).scalars().all(), page)
 
     if not feedbacks:
         return {"message": "No feedbacks found for this user", "feedbacks": []}
 
+    set_next_cursor(response, next_cursor)
     return {"feedbacks": feedbacks}
\ No newline at end of file
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends
+from geminiResponse import crop_cache, yield_cache, gemini_flight
+from app.jobs.queue import get_job_backend
+from app.ml.registry import registry
+from app.utils.identity import identity_cache
+from app.utils.passwords import password_hasher, bulk_password_hasher
+from app.database.database import engine, async_engine
+from app.utils.auth import admin_required
+
+# cache keys, queue depths and pool state are operator data, not for every caller
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(admin_required)]
+)
+
+@router.get("/gemini_cache")
+def gemini_cache_metrics():
+    """Hit/miss counters for the Gemini response caches of this worker"""
+    return {"caches": [crop_cache.stats(), yield_cache.stats()]}
+
+
+@router.get("/gemini_inflight")
+def gemini_inflight_metrics():
+    """Request coalescing counters for identical in-flight Gemini prompts"""
+    return gemini_flight.stats()
+
+
+@router.get("/jobs")
+async def job_metrics():
+    """Background job backend and queue depth"""
+    return await get_job_backend().stats()
+
+
+@router.get("/models")
+def model_metrics():
+    """Which model artifacts this worker has loaded and how long each load took"""
+    return registry.stats()
+
+
+@router.get("/identity")
+def identity_metrics():
+    """Hit/miss counters for the authenticated-user identity cache of this worker"""
+    return identity_cache.stats()
+
+
+@router.get("/passwords")
+def password_metrics():
+    """Queue depth, admission rejections and timings of the bcrypt process pool"""
+    return {"interactive": password_hasher.stats(), "bulk": bulk_password_hasher.stats()}
+
+
+@router.get("/db_pool")
+def db_pool_metrics():
+    """Checkout waits, timeouts, in-use count and connection ages of the database pools"""
+    return {"sync": engine.pool.stats(), "async": async_engine.pool.stats()} #type:ignore
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.Tables.Notiifcaitions import Notification
 from app.utils.auth import get_current_user
+from app.utils.pagination import PageParams, page_params, keyset, split_page, set_next_cursor
 from pydantic import BaseModel
 from datetime import datetime
 from schema import NotificationCreate, NotificationResponse
@@ -14,9 +17,9 @@ router = APIRouter(
 )
 
 @router.post("/create", response_model=NotificationResponse, status_code=status.HTTP_201_CREATED)
-def create_notification(
+async def create_notification(
     notification: NotificationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     new_notification = Notification(
@@ -27,23 +30,27 @@ def create_notification(
         is_read=False
     )
     db.add(new_notification)
-    db.commit()
-    db.refresh(new_notification)
+    await db.commit()
+    await db.refresh(new_notification)
 
     return new_notification
 
 
 @router.get("/my_notifications", response_model=List[NotificationResponse])
-def get_my_notifications(
-    db: Session = Depends(get_db),
+async def get_my_notifications(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    notifications = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id) #type:ignore
-        .order_by(Notification.created_at.desc())
-        .all()
-    )
+    """Newest first; the cursor for the next page is sent in the X-Next-Cursor header"""
+    result = await db.execute(keyset(
+        select(Notification).where(Notification.user_id == current_user.id), #type:ignore
+        Notification, page
+    ))
+    notifications, next_cursor = split_page(result.scalars().all(), page)
+
+    set_next_cursor(response, next_cursor)
     return notifications
 
 
@@ -1,65 +1,46 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Depends
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import numpy as np
+import pandas as pd
+import asyncio
+import csv
+import io
+import shutil
+import tempfile
+from typing import Literal
 from dotenv import load_dotenv
-import pickle
-import sklearn
-from schema import YieldPredictionRequest
-from geminiResponse import call_gemini_yield
+from schema import YieldPredictionRequest, YieldSweepRequest, YieldPredictionOut, YieldPredictionPage
+from geminiResponse import acall_gemini_yield, acall_gemini_sweep_summary
 import os
 from app.utils.auth import get_current_user
-from app.database.database import get_db
+from app.utils.pagination import PageParams, page_params, keyset, split_page, set_next_cursor
+from app.config import settings
+from app.database.database import get_db, checkout_within, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 import json
 from app.Tables.YieldPredictionTable import CropPrediction
+from app.ml import yield_predictor
 
 
 load_dotenv()
 
 api_key = os.environ['GEMINI_API_KEY'] 
 
-dtr = pickle.load(open('app/Model/YeildPrediction/dtr.pkl','rb'))
-preprocessor = pickle.load(open('app/Model/YeildPrediction/preprocessor.pkl','rb'))
-
 router = APIRouter(
     prefix="/yeild_prediction",
     tags = ['Yeild Prediction']
 )
 
 
-@router.post("/predict")
-def predict(
-    request: YieldPredictionRequest,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)  
-):
-    features = np.array([[
-        request.Year,
-        request.average_rain_fall_mm_per_year,
-        request.pesticides_tonnes,
-        request.avg_temp,
-        request.Area,
-        request.Item
-    ]], dtype=object)
-
-    transformed_features = preprocessor.transform(features)
-    prediction = dtr.predict(transformed_features)[0]
-
-    yield_dict = {
-        "item": request.Item,
-        "area": request.Area,
-        "year": request.Year,
-        "predicted_yield": round(float(prediction), 2),
-        "unit": "hg/ha",
-        "rainfall_mm_per_year": request.average_rain_fall_mm_per_year,
-        "pesticides_tonnes": request.pesticides_tonnes,
-        "avg_temp_celsius": request.avg_temp
-    }
-
-    enhanced_response = call_gemini_yield(yield_dict, api_key)
-
+def _save_prediction(db: Session, user_id: int, enhanced_response: dict):
+    # the wait budget applies here, after Gemini, so no connection is held while it answers
+    checkout_within(db)
     new_prediction = CropPrediction(
-        user_id=current_user.id,   #type:ignore
+        user_id=user_id,
         item=enhanced_response["item"],
         area=enhanced_response["area"],
         year=enhanced_response["year"],
@@ -82,40 +63,282 @@ def predict(
     db.commit()
     db.refresh(new_prediction)
 
-    return enhanced_response
+    return new_prediction
+
 
-@router.get("/my_predictions")
-def get_user_yield_predictions(
+@router.post("/predict")
+async def predict(
+    request: YieldPredictionRequest,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)  
+):
+    features = yield_predictor.features_row(request)
+    # off the event loop: the first call on a worker may still load the model
+    prediction = (await run_in_threadpool(yield_predictor.predict, features))[0]
+
+    yield_dict = {
+        "item": request.Item,
+        "area": request.Area,
+        "year": request.Year,
+        "predicted_yield": round(float(prediction), 2),
+        "unit": "hg/ha",
+        "rainfall_mm_per_year": request.average_rain_fall_mm_per_year,
+        "pesticides_tonnes": request.pesticides_tonnes,
+        "avg_temp_celsius": request.avg_temp
+    }
+
+    enhanced_response = await acall_gemini_yield(yield_dict, api_key)
+
+    await run_in_threadpool(_save_prediction, db, current_user.id, enhanced_response) #type:ignore
+
+    return enhanced_response
+
+CSV_FIELDS = ["row", "item", "area", "year", "predicted_yield", "unit", "error"]
+
+
+def _open_csv(upload):
+    # the upload is closed once the endpoint returns, before the response is
+    # streamed, so the reader gets its own on-disk copy
+    file = tempfile.TemporaryFile()
+    shutil.copyfileobj(upload, file)
+    file.seek(0)
+
+    header = next(csv.reader([file.readline().decode("utf-8-sig")]), [])
+    file.seek(0)
+    if not header:
+        file.close()
+        raise HTTPException(status_code=400, detail="CSV file is empty")
+
+    missing = [c for c in yield_predictor.COLUMNS if c not in header]
+    if missing:
+        file.close()
+        raise HTTPException(status_code=400, detail=f"CSV is missing columns: {', '.join(missing)}")
+
+    reader = pd.read_csv(
+        file,
+        usecols=yield_predictor.COLUMNS,
+        dtype={"Area": str, "Item": str},
+        chunksize=settings.YIELD_CSV_CHUNK_ROWS
+    )
+    return file, reader
+
+
+def _predict_next_chunk(reader, first_row: int):
+    """Parses, validates and predicts the next chunk; None once the file is exhausted."""
+    chunk = next(reader, None)
+    if chunk is None:
+        return None
+
+    predictions, errors = yield_predictor.predict_frame(chunk)
+    records = []
+    for i, (prediction, error) in enumerate(zip(predictions, errors)):
+        if error is not None:
+            records.append({"row": first_row + i, "error": error})
+            continue
+        row = chunk.iloc[i]
+        records.append({
+            "row": first_row + i,
+            "item": row["Item"].strip(),
+            "area": row["Area"].strip(),
+            "year": int(row["Year"]),
+            "predicted_yield": round(float(prediction), 2),
+            "unit": "hg/ha",
+            "rainfall_mm_per_year": float(row["average_rain_fall_mm_per_year"]),
+            "pesticides_tonnes": float(row["pesticides_tonnes"]),
+            "avg_temp_celsius": float(row["avg_temp"])
+        })
+    return records
+
+
+async def _enrich_records(records: list, semaphore: asyncio.Semaphore):
+    async def enrich(record: dict):
+        async with semaphore:
+            try:
+                record["enrichment"] = await acall_gemini_yield(
+                    {k: v for k, v in record.items() if k != "row"}, api_key
+                )
+            except Exception as e:
+                record["enrichment"] = {"error": str(e)}
+
+    await asyncio.gather(*[enrich(r) for r in records if "error" not in r])
+
+
+def _csv_lines(records: list, enrich: bool, header: bool) -> str:
+    fields = CSV_FIELDS + (["summary"] if enrich else [])
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for record in records:
+        if enrich and "enrichment" in record:
+            record = {**record, "summary": record["enrichment"].get("summary")}
+        writer.writerow(record)
+    return out.getvalue()
+
+
+@router.post("/predict_csv")
+async def predict_csv(
+    file: UploadFile = File(...),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    enrich: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Predicts yield for every row of an uploaded CSV with the columns
+    Year, average_rain_fall_mm_per_year, pesticides_tonnes, avg_temp, Area, Item.
+    The file is read in chunks, each chunk is predicted in one pass and its
+    results are streamed back straight away, so memory stays flat.
+    Invalid rows get an `error` instead of a prediction. Results are not stored.
+    """
+    copy, reader = await run_in_threadpool(_open_csv, file.file)
+    semaphore = asyncio.Semaphore(settings.GEMINI_BATCH_CONCURRENCY)
+
+    async def results():
+        first_row = 0
+        try:
+            while True:
+                records = await run_in_threadpool(_predict_next_chunk, reader, first_row)
+                if records is None:
+                    break
+                if enrich:
+                    await _enrich_records(records, semaphore)
+
+                if format == "csv":
+                    yield _csv_lines(records, enrich, header=first_row == 0)
+                else:
+                    yield "".join(json.dumps(record) + "\n" for record in records)
+                first_row += len(records)
+        finally:
+            reader.close()
+            copy.close()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(results(), media_type=media_type)
+
+
+def _run_sweep(request: YieldSweepRequest) -> dict:
+    base = request.base
+    areas, items = yield_predictor.known_categories()
+    if base.Area not in areas:
+        raise HTTPException(status_code=400, detail=f"Unknown Area '{base.Area}'")
+    if base.Item not in items:
+        raise HTTPException(status_code=400, detail=f"Unknown Item '{base.Item}'")
+
+    ranges = {c: getattr(request, c) for c in yield_predictor.NUMERIC_COLUMNS if getattr(request, c) is not None}
+    axes = yield_predictor.sweep_axes(base, ranges)
+    points = int(np.prod([len(values) for values in axes.values()]))
+    if points > settings.YIELD_SWEEP_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sweep has {points} points, at most {settings.YIELD_SWEEP_MAX_POINTS} are allowed"
+        )
+
+    surface = yield_predictor.predict_grid(axes, base.Area, base.Item)
+    base_yield = yield_predictor.predict(yield_predictor.features_row(base))[0]
+
+    # drop the axes that were not swept so the surface only has the varied dimensions
+    swept = [c for c in yield_predictor.NUMERIC_COLUMNS if c in ranges]
+    surface = surface.reshape([len(axes[c]) for c in swept])
+
+    def point(flat_index: int) -> dict:
+        index = np.unravel_index(flat_index, surface.shape)
+        return {
+            **{c: float(axes[c][i]) for c, i in zip(swept, index)},
+            "predicted_yield": round(float(surface[index]), 2)
+        }
+
+    return {
+        "item": base.Item,
+        "area": base.Area,
+        "unit": "hg/ha",
+        "base": {**{c: getattr(base, c) for c in yield_predictor.NUMERIC_COLUMNS}, "predicted_yield": round(float(base_yield), 2)},
+        "points": points,
+        "axes": {c: axes[c].tolist() for c in swept},
+        "yields": np.round(surface, 2).tolist(),
+        "min": point(int(np.argmin(surface))),
+        "max": point(int(np.argmax(surface))),
+        # mean yield along each swept axis, averaged over the others
+        "marginals": {
+            c: np.round(surface.mean(axis=tuple(j for j in range(len(swept)) if j != i)), 2).tolist()
+            for i, c in enumerate(swept)
+        },
+    }
+
+
+@router.post("/sweep")
+async def sweep(
+    request: YieldSweepRequest,
+    current_user: dict = Depends(get_current_user)
 ):
     """
-    Get all yield predictions of the logged-in user
+    What-if yield surface: the Cartesian grid of the given rainfall,
+    temperature, pesticide and year ranges around a base request, predicted
+    in one pass. With summarize=true a single Gemini call explains the
+    surface. Results are not stored.
     """
-    predictions = db.query(CropPrediction).filter(
+    result = await run_in_threadpool(_run_sweep, request)
+
+    if request.summarize:
+        summary_input = {k: result[k] for k in ("item", "area", "unit", "base", "axes", "min", "max", "marginals")}
+        result["summary"] = await acall_gemini_sweep_summary(summary_input, api_key)
+
+    return result
+
+
+SUMMARY_COLUMNS = (
+    CropPrediction.id,
+    CropPrediction.item,
+    CropPrediction.area,
+    CropPrediction.year,
+    CropPrediction.predicted_yield,
+    CropPrediction.unit,
+    CropPrediction.predicted_crop,
+    CropPrediction.suitability_score,
+    CropPrediction.summary,
+    CropPrediction.created_at,
+)
+
+
+@router.get("/my_predictions", response_model=YieldPredictionPage, response_model_exclude_unset=True)
+async def get_user_yield_predictions(
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)  
+):
+    """
+    Yield predictions of the logged-in user, newest first.
+    The cursor for the next page is sent in the X-Next-Cursor header.
+    view=summary leaves out the long Gemini text fields;
+    fetch them with /my_predictions/{id}.
+    """
+    columns = SUMMARY_COLUMNS if view == "summary" else (CropPrediction,)
+    stmt = keyset(select(*columns).where(
         CropPrediction.user_id == current_user.id  # type: ignore
-    ).all()
-
-    results = []
-    for pred in predictions:
-        results.append({
-            "id": pred.id,
-            "item": pred.item,
-            "area": pred.area,
-            "year": pred.year,
-            "predicted_yield": pred.predicted_yield,
-            "unit": pred.unit,
-            "predicted_crop": pred.predicted_crop,
-            "suitability_score": pred.suitability_score,
-            "best_planting_time": pred.best_planting_time,
-            "harvest_period": pred.harvest_period,
-            "water_requirements": pred.water_requirements,
-            "fertilizer_recommendations": pred.fertilizer_recommendations,
-            "soil_condition": pred.soil_condition,
-            "expected_yield": pred.expected_yield,
-            "expected_market_price": pred.expected_market_price,
-            "summary": pred.summary,
-            "created_at": pred.created_at.isoformat() if pred.created_at else None #type:ignore
-        })
+    ), CropPrediction, page)
+    result = await db.execute(stmt)
+    predictions, next_cursor = split_page(
+        result.all() if view == "summary" else result.scalars().all(), page
+    )
+
+    set_next_cursor(response, next_cursor)
+    return {"yield_predictions": predictions}
+
+
+@router.get("/my_predictions/{prediction_id}", response_model=YieldPredictionOut)
+async def get_user_yield_prediction(
+    prediction_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """One yield prediction of the logged-in user with all its fields"""
+    pred = (await db.execute(select(CropPrediction).where(
+        CropPrediction.id == prediction_id,
+        CropPrediction.user_id == current_user.id  # type: ignore
+    ))).scalar_one_or_none()
+
+    if pred is None:
+        raise HTTPException(status_code=404, detail="Prediction not found")
 
-    return {"yield_predictions": results}
+    return pred
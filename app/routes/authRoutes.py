@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException,Body, Header, Form, status
+from fastapi import APIRouter, Depends, HTTPException,Body, Header, Form, status, Request
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, date
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, update, exists, case, cast, literal, null, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import ValidationError
+import csv
+import io
 from fastapi.security import OAuth2PasswordRequestForm
 from app.database.database import get_db, redis_client
 from passlib.context import CryptContext
-from app.Tables.UserTable import User
-from schema import UserCreate, UserLogin, Token
-from app.utils.auth import hash_password, verify_password, get_current_user
+from app.Tables.UserTable import User, UserRole
+from app.config import settings
+from schema import UserCreate, UserLogin, Token, SessionList
+from app.utils.auth import hash_password, verify_password, get_current_user, admin_required, get_token_payload
+from app.utils import sessions
+from app.utils.passwords import ahash_password, averify_and_update, bulk_password_hasher
 from sqlalchemy.exc import IntegrityError
-from app.utils.jwt import create_access_token, verify_token
+from app.utils.jwt import create_access_token, verify_token, token_claims
 
 router = APIRouter(
     prefix="/auth", 
@@ -17,25 +26,75 @@ router = APIRouter(
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# unique indexes on users -> message for the duplicate; the column names cover
+# drivers that only report "UNIQUE constraint failed: users.<column>"
+UNIQUE_VIOLATIONS = {
+    "ix_users_email": "Email already registered",
+    "ix_users_phone_number": "Phone number already registered",
+    "ix_users_aadhaar_number": "Aadhaar number already registered",
+    "users_pan_number_key": "PAN number already registered",
+    "users.email": "Email already registered",
+    "users.phone_number": "Phone number already registered",
+    "users.aadhaar_number": "Aadhaar number already registered",
+    "users.pan_number": "PAN number already registered",
+}
+
+# Set once any user is known to exist. Until then inserts carry the
+# first-user check inline; afterwards there is nothing left to check.
+_users_exist = False
+
+
+def duplicate_user_message(e: IntegrityError) -> str:
+    constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None)
+    if constraint in UNIQUE_VIOLATIONS:
+        return UNIQUE_VIOLATIONS[constraint]
+    text = str(e.orig)
+    for name, message in UNIQUE_VIOLATIONS.items():
+        if name in text:
+            return message
+    return "User with given details already exists"
+
+
+def _insert_user(db: Session, values: dict):
+    """
+    One INSERT ... RETURNING; duplicates are caught by the unique indexes,
+    so concurrent registrations of the same details cannot both succeed.
+    """
+    global _users_exist
+    if not _users_exist:
+        # an explicit role replaces the column default, so the else branch must restate it
+        values["role"] = case(
+            (~exists(select(User.id)), cast(literal(UserRole.ADMIN.name), User.role.type)),
+            else_=cast(literal(UserRole.FARMER.name), User.role.type)
+        )
+
+    try:
+        row = db.execute(
+            insert(User).values(**values).returning(User.id, User.email, User.role)
+        ).one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        _users_exist = True
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=duplicate_user_message(e)
+        )
+
+    _users_exist = True
+    return row
+
+
 @router.post("/register")
-def register_user(
+async def register_user(
     user: UserCreate, 
     db: Session = Depends(get_db)
 ):
-    first_user = db.query(User).first()
-
-    if db.query(User).filter(User.email == user.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(User).filter(User.phone_number == user.phone_number).first():
-        raise HTTPException(status_code=400, detail="Phone number already registered")
-    if db.query(User).filter(User.aadhaar_number == user.aadhaar_number).first():
-        raise HTTPException(status_code=400, detail="Aadhaar number already registered")
-    
     if user.terms_and_condition_followed == False or user.terms_and_condition_followed == None:
         raise HTTPException(status_code=400, detail="Terms and Condition are required")
     
-    hashed_password = hash_password(user.password)
-    new_user = User(
+    hashed_password = await ahash_password(user.password)
+    new_user = await run_in_threadpool(_insert_user, db, dict(
         email=user.email,
         full_name= user.full_name,
         password_hash=hashed_password,
@@ -48,21 +107,7 @@ def register_user(
         current_state=user.current_state,
         current_pincode=user.current_pincode,
         total_land_holdings=user.total_land_holdings
-    )
-
-    if first_user == None :
-        new_user.role = "ADMIN" # type:ignore
-
-    try:
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User with given details already exists"
-        )
+    ))
 
     return {
         "message": "User registered successfully",
@@ -71,15 +116,181 @@ def register_user(
         "role": new_user.role
     }
 
+
+UNIQUE_FIELDS = {
+    "email": "Email already registered",
+    "phone_number": "Phone number already registered",
+    "aadhaar_number": "Aadhaar number already registered",
+}
+
+
+async def _bulk_rows(request: Request) -> list:
+    """JSON array body, a text/csv body, or a multipart upload in the `file` field."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        rows = await request.json()
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of users")
+        return rows
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the CSV in a 'file' field")
+        text = (await upload.read()).decode("utf-8-sig")
+    elif content_type.startswith("text/csv"):
+        text = (await request.body()).decode("utf-8-sig")
+    else:
+        raise HTTPException(status_code=415, detail="Send application/json, text/csv or a multipart CSV file")
+
+    # empty cells fall back to the UserCreate defaults
+    return [{k: v for k, v in row.items() if v not in ("", None)} for row in csv.DictReader(io.StringIO(text))]
+
+
+def _existing_values(db: Session, users: list) -> dict:
+    """Which of the batch's emails, phones and aadhaar numbers exist, in one query."""
+    rows = db.execute(
+        select(User.email, User.phone_number, User.aadhaar_number).where(or_(
+            User.email.in_([u.email for u in users]),
+            User.phone_number.in_([u.phone_number for u in users]),
+            User.aadhaar_number.in_([u.aadhaar_number for u in users]),
+        ))
+    ).all()
+    return {field: {getattr(row, field) for row in rows} for field in UNIQUE_FIELDS}
+
+
+def _bulk_insert(db: Session, values: list) -> dict:
+    """
+    Multi-row INSERT (batched by SQLAlchemy's insertmanyvalues) that skips
+    rows hitting a unique index, e.g. one registered since the duplicate check.
+    Returns phone number -> new id for the rows actually inserted.
+    """
+    if not values:
+        return {}
+    rows = db.execute(
+        pg_insert(User).on_conflict_do_nothing().returning(User.id, User.phone_number),
+        values
+    ).all()
+    db.commit()
+    return {row.phone_number: row.id for row in rows}
+
+
+@router.post("/bulk_register")
+async def bulk_register_users(
+    request: Request,
+    db: Session = Depends(get_db),
+    admin = Depends(admin_required)
+):
+    """
+    Admin-only onboarding of many farmers from a JSON list or a CSV with the
+    /register fields as columns. Every row is validated with UserCreate and
+    checked for duplicates, in the batch and (with one query) in the
+    database; passwords of the remaining rows are hashed across all cores
+    and the rows are inserted together. Returns a status per input row.
+    """
+    rows = await _bulk_rows(request)
+    if len(rows) > settings.BULK_REGISTER_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_REGISTER_MAX_ROWS} users per request")
+
+    results = [{"row": i} for i in range(len(rows))]
+    accepted = []
+    seen = {field: set() for field in UNIQUE_FIELDS}
+
+    for result, row in zip(results, rows):
+        try:
+            user = UserCreate.model_validate(row)
+        except ValidationError as e:
+            result.update(status="invalid", errors=[f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()])
+            continue
+        if not user.terms_and_condition_followed:
+            result.update(status="invalid", errors=["Terms and Condition are required"])
+            continue
+        if user.role.value == UserRole.ADMIN.value:
+            result.update(status="invalid", errors=["Bulk registration cannot create admins"])
+            continue
+
+        duplicate = next((f for f in UNIQUE_FIELDS if getattr(user, f) in seen[f]), None)
+        if duplicate:
+            result.update(status="duplicate", detail=f"{UNIQUE_FIELDS[duplicate]} earlier in this upload")
+            continue
+        for field in UNIQUE_FIELDS:
+            seen[field].add(getattr(user, field))
+        accepted.append((result, user))
+
+    if accepted:
+        existing = await run_in_threadpool(_existing_values, db, [user for _, user in accepted])
+        remaining = []
+        for result, user in accepted:
+            duplicate = next((f for f in UNIQUE_FIELDS if getattr(user, f) in existing[f]), None)
+            if duplicate:
+                result.update(status="duplicate", detail=UNIQUE_FIELDS[duplicate])
+            else:
+                remaining.append((result, user))
+        accepted = remaining
+
+    hashes = await bulk_password_hasher.hash_many([user.password for _, user in accepted])
+    values = [
+        dict(
+            email=user.email,
+            full_name=user.full_name,
+            password_hash=hashed,
+            role=UserRole(user.role.value),
+            terms_and_condition_followed=user.terms_and_condition_followed,
+            phone_number=user.phone_number,
+            aadhaar_number=user.aadhaar_number,
+            current_village=user.current_village,
+            current_taluka=user.current_taluka,
+            current_district=user.current_district,
+            current_state=user.current_state,
+            current_pincode=user.current_pincode,
+            total_land_holdings=user.total_land_holdings
+        )
+        for (_, user), hashed in zip(accepted, hashes)
+    ]
+    inserted = await run_in_threadpool(_bulk_insert, db, values)
+
+    for result, user in accepted:
+        user_id = inserted.get(user.phone_number)
+        if user_id is None:
+            result.update(status="duplicate", detail="User with given details already exists")
+        else:
+            result.update(status="created", user_id=user_id)
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    return {"total": len(results), **counts, "results": results}
+
+
+def _find_login_user(db: Session, user: UserLogin):
+    # only the columns login needs, not the whole ~70 column row
+    return db.execute(
+        select(User.id, User.phone_number, User.role, User.full_name, User.is_active, User.password_hash)
+        .where(User.phone_number == user.phone_number)
+    ).first()
+
+
+def _record_login(db: Session, user_id: int, claims: dict, new_hash):
+    values = {"last_login": func.now()}
+    if new_hash:
+        values["password_hash"] = new_hash
+    db.execute(update(User).where(User.id == user_id).values(**values))
+    db.commit()
+
+    sessions.register_session(user_id, claims["jti"], claims["iat"], claims["exp"])
+
+
 @router.post("/login", response_model=Token)
-def login_user(
+async def login_user(
     user: UserLogin,
     db: Session = Depends(get_db),
 ):
     """
     Authenticate user with phone number and password
     """
-    db_user = db.query(User).filter(User.phone_number == user.phone_number and User.email == user.email).first()
+    db_user = await run_in_threadpool(_find_login_user, db, user)
     
     if not db_user:
         raise HTTPException(
@@ -93,13 +304,13 @@ def login_user(
             detail="Account is deactivated. Please contact support."
         )
     
-    if not verify_password(user.password, db_user.password_hash): #type:ignore
+    # a hash made with a different BCRYPT_ROUNDS comes back re-hashed at the current cost
+    verified, new_hash = await averify_and_update(user.password, db_user.password_hash) #type:ignore
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid phone number or password"
         )
-    
-    db_user.last_login = datetime.now() #type:ignore
 
     access_token = create_access_token(
         data={
@@ -109,8 +320,7 @@ def login_user(
         }
     )
 
-    db_user.jwt_token = access_token #type:ignore
-    db.commit()
+    await run_in_threadpool(_record_login, db, db_user.id, token_claims(access_token), new_hash)
     
     return {
         "access_token": access_token,
@@ -119,4 +329,28 @@ def login_user(
         "role": db_user.role.value,
         "full_name": db_user.full_name
     }
-    
\ No newline at end of file
+
+
+@router.post("/logout")
+def logout(payload: dict = Depends(get_token_payload)):
+    """Revokes the token used for this request"""
+    if "jti" not in payload:
+        raise HTTPException(status_code=400, detail="This token predates session tracking; use /auth/logout_all")
+    sessions.revoke(payload)
+    return {"message": "Logged out"}
+
+
+@router.post("/logout_all")
+def logout_all(payload: dict = Depends(get_token_payload)):
+    """Revokes every token issued to the user so far, on all devices"""
+    sessions.revoke_all(int(payload["sub"]))
+    return {"message": "Logged out of all sessions"}
+
+
+@router.get("/sessions", response_model=SessionList)
+def list_sessions(payload: dict = Depends(get_token_payload)):
+    """Unexpired sessions of the logged-in user"""
+    active = sessions.list_sessions(int(payload["sub"]))
+    for session in active:
+        session["current"] = session["jti"] == payload.get("jti")
+    return {"sessions": active}
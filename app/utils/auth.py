@@ -4,13 +4,12 @@ from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.Tables.UserTable import User, UserRole
 from app.utils.jwt import verify_token
-from passlib.context import CryptContext
+from app.utils.identity import Principal, identity_cache
+from app.utils.passwords import pwd_context
 import redis
 from typing import Dict
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 redis_client = redis.StrictRedis(host="localhost", port=6379, db=0, decode_responses=True)
 
 def hash_password(password: str) -> str:
@@ -22,7 +21,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_current_user(
     jwt_token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-):
+) -> Principal:
+    """
+    The caller's Principal (id, role, is_active), served from the identity
+    cache; the database is only queried on a cache miss.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication credentials",
@@ -37,11 +40,17 @@ def get_current_user(
         if not user_id:
             raise credentials_exception
 
-        user = db.query(User).filter(User.id == user_id).first()
+        user = identity_cache.get(int(user_id), db)
+        # a cache miss read through `db`; end that transaction so its connection
+        # goes back to the pool instead of staying out for the whole request
+        db.rollback()
 
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
+        if not user.is_active:
+            raise HTTPException(status_code=401, detail="Account is deactivated. Please contact support.")
+
         return user
 
     except HTTPException as e:
@@ -51,12 +60,12 @@ def get_current_user(
         print("Unexpected error:", e)  
         raise credentials_exception
     
-def admin_required(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token) 
-    
-    user = db.query(User).filter(User.id == payload["user_id"]).first()
+def get_token_payload(jwt_token: str = Depends(oauth2_scheme)) -> Dict:
+    """The verified claims of the bearer token (sub, jti, iat, exp, ...)."""
+    return verify_token(jwt_token)
 
-    if not user or user.role != UserRole.ADMIN: # type: ignore
+def admin_required(user: Principal = Depends(get_current_user)):
+    if user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     return user  
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import redis
+from app.database.database import async_redis_client
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def canonical_key(model: str, template_version: str, payload: dict) -> str:
+    """Stable hash of everything that determines the prompt sent to the model."""
+    canonical = json.dumps(
+        {"model": model, "template": template_version, "input": _normalize(payload)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for JSON-serializable responses: an in-process LRU in
+    front of Redis. Redis failures are counted and treated as misses.
+    """
+
+    def __init__(self, namespace: str, ttl: int, local_ttl: int, local_maxsize: int, enabled: bool = True):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.enabled = enabled
+        self.local = LRUCache(local_maxsize, min(local_ttl, ttl))
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "sets": 0, "redis_errors": 0}
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        raw = self.local.get(key)
+        if raw is not None:
+            self.counters["local_hits"] += 1
+            return json.loads(raw)
+
+        try:
+            raw = await async_redis_client.get(self._redis_key(key))
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+            raw = None
+
+        if raw is None:
+            self.counters["misses"] += 1
+            return None
+
+        self.counters["redis_hits"] += 1
+        self.local.set(key, raw)
+        return json.loads(raw)
+
+    async def set(self, key: str, value: dict):
+        if not self.enabled:
+            return
+
+        raw = json.dumps(value)
+        self.local.set(key, raw)
+        self.counters["sets"] += 1
+        try:
+            await async_redis_client.set(self._redis_key(key), raw, ex=self.ttl)
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["misses"]
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        return {
+            "namespace": self.namespace,
+            "enabled": self.enabled,
+            "local_entries": len(self.local),
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
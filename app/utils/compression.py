@@ -0,0 +1,222 @@
+import struct
+import zlib
+from typing import Iterable, List, Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# ---------- Stored gzip segments ----------
+#
+# A segment is one piece of a response body compressed on its own as raw
+# DEFLATE, ended with a sync flush (byte aligned, no final block), and
+# prefixed with the CRC-32 and length of the uncompressed bytes. Segments
+# can be concatenated into a single valid gzip member without inflating
+# them: the deflate data is joined as is, and the CRCs are combined.
+
+_SEGMENT_HEADER = struct.Struct("<II")
+# magic, deflate, no flags, mtime 0, no extra flags, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# an empty final fixed-Huffman block, what zlib emits for Z_FINISH after a sync flush
+_DEFLATE_END = b"\x03\x00"
+
+
+def deflate_segment(data: bytes, level: int = 6) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return _SEGMENT_HEADER.pack(zlib.crc32(data), len(data)) + body
+
+
+def inflate_segment(segment: bytes) -> bytes:
+    crc, size = _SEGMENT_HEADER.unpack_from(segment)
+    data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(memoryview(segment)[_SEGMENT_HEADER.size:])
+    if len(data) != size or zlib.crc32(data) != crc:
+        raise ValueError("Corrupt compressed segment")
+    return data
+
+
+def _gf2_times(matrix: List[int], vector: int) -> int:
+    total, i = 0, 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return total
+
+
+def _gf2_square(matrix: List[int]) -> List[int]:
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def _zero_operators() -> List[List[int]]:
+    # _ZEROS[k] advances a CRC-32 over 2**k zero bytes (zlib's crc32_combine)
+    one_bit = [0xEDB88320] + [1 << n for n in range(31)]
+    one_byte = _gf2_square(_gf2_square(_gf2_square(one_bit)))
+    operators = [one_byte]
+    for _ in range(31):
+        operators.append(_gf2_square(operators[-1]))
+    return operators
+
+
+_ZEROS = _zero_operators()
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """CRC-32 of A + B from crc32(A), crc32(B) and len(B)."""
+    k = 0
+    while len2:
+        if len2 & 1:
+            crc1 = _gf2_times(_ZEROS[k], crc1)
+        len2 >>= 1
+        k += 1
+    return crc1 ^ crc2
+
+
+def gzip_from_segments(segments: Iterable[bytes]) -> bytes:
+    crc, size, parts = 0, 0, [_GZIP_HEADER]
+    for segment in segments:
+        segment_crc, segment_size = _SEGMENT_HEADER.unpack_from(segment)
+        crc = crc32_combine(crc, segment_crc, segment_size)
+        size += segment_size
+        parts.append(memoryview(segment)[_SEGMENT_HEADER.size:])
+    parts.append(_DEFLATE_END)
+    parts.append(struct.pack("<II", crc, size & 0xFFFFFFFF))
+    return b"".join(parts)
+
+
+# ---------- Content negotiation ----------
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Codings from an Accept-Encoding header, without the ones marked q=0."""
+    codings = []
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().lower()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if coding:
+            codings.append(coding.strip().lower())
+    return codings
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    codings = accepted_encodings(accept_encoding)
+    return "gzip" in codings or "*" in codings
+
+
+# ---------- Middleware ----------
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTTP responses with brotli (when installed and accepted) or
+    gzip. Only bodies of an allowlisted content type and at least
+    `minimum_size` bytes are compressed; responses that already carry a
+    Content-Encoding (e.g. stored gzip) and event streams pass through.
+    Streamed bodies are compressed chunk by chunk with a flush after each,
+    so NDJSON/CSV rows still reach the client as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, content_types: Iterable[str] = ("application/json",),
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = {t.lower() for t in content_types}
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope) -> Optional[str]:
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), None)
+        codings = accepted_encodings(accept)
+        if brotli is not None and "br" in codings:
+            return "br"
+        if "gzip" in codings or "*" in codings:
+            return "gzip"
+        return None
+
+    def _stream(self, encoding: str):
+        return _BrotliStream(self.brotli_quality) if encoding == "br" else _GzipStream(self.gzip_level)
+
+    def _compressible(self, headers: dict) -> bool:
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+        return content_type in self.content_types and content_type != "text/event-stream"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        stream = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, stream, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is None:
+                headers = dict(start["headers"])
+                if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                stream = self._stream(encoding)
+                raw_headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+                raw_headers.append((b"content-encoding", encoding.encode("ascii")))
+                vary = headers.get(b"vary")
+                raw_headers = [(k, v) for k, v in raw_headers if k != b"vary"]
+                raw_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+
+                if not more_body:
+                    compressed = stream.compress(body, final=True)
+                    raw_headers.append((b"content-length", str(len(compressed)).encode("ascii")))
+                    await send({**start, "headers": raw_headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                await send({**start, "headers": raw_headers})
+
+            await send({
+                "type": "http.response.body",
+                "body": stream.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
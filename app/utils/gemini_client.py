@@ -0,0 +1,107 @@
+import json
+import httpx
+from typing import AsyncIterator, Optional
+from app.config import settings
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout(seconds: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(
+        seconds or settings.GEMINI_TIMEOUT_SECONDS,
+        connect=settings.GEMINI_CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive client used by every async Gemini call in this worker."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=settings.GEMINI_HTTP2,
+            limits=_limits(),
+            timeout=_timeout(),
+        )
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Pooled client for the remaining sync callers (scripts, threadpool code)."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            http2=settings.GEMINI_HTTP2,
+            limits=_limits(),
+            timeout=_timeout(),
+        )
+    return _sync_client
+
+
+def _request_args(model: str, api_key: str, action: str = "generateContent"):
+    url = f"{GEMINI_BASE_URL}/{model}:{action}"
+    headers = {
+        "Content-Type": "application/json",
+        "x-goog-api-key": api_key
+    }
+    return url, headers
+
+
+def _check_response(resp: httpx.Response) -> dict:
+    if resp.status_code != 200:
+        raise Exception(f"Gemini API error {resp.status_code}: {resp.text}")
+    return resp.json()
+
+
+async def agenerate_content(body: dict, api_key: str, model: str, timeout: Optional[float] = None) -> dict:
+    url, headers = _request_args(model, api_key)
+    resp = await get_async_client().post(url, headers=headers, json=body, timeout=_timeout(timeout))
+    return _check_response(resp)
+
+
+def generate_content(body: dict, api_key: str, model: str, timeout: Optional[float] = None) -> dict:
+    url, headers = _request_args(model, api_key)
+    resp = get_sync_client().post(url, headers=headers, json=body, timeout=_timeout(timeout))
+    return _check_response(resp)
+
+
+async def astream_generate_content(
+    body: dict, api_key: str, model: str, timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    """Yields text fragments from streamGenerateContent as Gemini produces them."""
+    url, headers = _request_args(model, api_key, "streamGenerateContent")
+    async with get_async_client().stream(
+        "POST", url, params={"alt": "sse"}, headers=headers, json=body, timeout=_timeout(timeout)
+    ) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            raise Exception(f"Gemini API error {resp.status_code}: {resp.text}")
+
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = json.loads(line[len("data:"):])
+            for candidate in chunk.get("candidates", []):
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+
+async def close_clients():
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,66 @@
+import hashlib
+from typing import Optional
+import orjson
+from sqlalchemy import delete, event, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.Tables.CropGuidance import CropGuidances
+from app.Tables.GuidanceBlobs import GuidanceBlob
+from app.utils.compression import deflate_segment
+
+blobs = GuidanceBlob.__table__
+
+
+def canonical_guidance(guidance: dict) -> bytes:
+    """Key order does not change the hash, so identical guidance is stored once."""
+    return orjson.dumps(guidance, option=orjson.OPT_SORT_KEYS)
+
+
+def _summary(guidance: dict) -> Optional[str]:
+    summary = guidance.get("summary") if isinstance(guidance, dict) else None
+    if summary is None or isinstance(summary, str):
+        return summary
+    return orjson.dumps(summary).decode("utf-8")
+
+
+def store_guidance_blob(db: Session, guidance: dict) -> str:
+    """
+    Adds a reference to the blob holding `guidance` and returns its key.
+    Guidance that is already stored costs one counter bump and is not
+    compressed again; new guidance is compressed once and inserted.
+    """
+    data = canonical_guidance(guidance)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    bumped = db.execute(
+        update(blobs).where(blobs.c.sha256 == sha256).values(ref_count=blobs.c.ref_count + 1)
+    ).rowcount
+    if bumped:
+        return sha256
+
+    # another writer may insert the same guidance between the update and here
+    db.execute(
+        pg_insert(blobs)
+        .values(
+            sha256=sha256,
+            content=deflate_segment(data, settings.GUIDANCE_GZIP_LEVEL),
+            size=len(data),
+            summary=_summary(guidance),
+            ref_count=1,
+        )
+        .on_conflict_do_update(index_elements=[blobs.c.sha256], set_={"ref_count": blobs.c.ref_count + 1})
+    )
+    return sha256
+
+
+@event.listens_for(CropGuidances, "after_delete")
+def _release_blob(mapper, connection, target):
+    """Drops a deleted row's reference; the last one removes the blob."""
+    connection.execute(
+        update(blobs).where(blobs.c.sha256 == target.guidance_sha256).values(ref_count=blobs.c.ref_count - 1)
+    )
+    # re-checked under the row lock, so a concurrent store that bumped the count keeps the blob
+    connection.execute(
+        delete(blobs).where(blobs.c.sha256 == target.guidance_sha256, blobs.c.ref_count <= 0)
+    )
@@ -0,0 +1,145 @@
+import json
+from dataclasses import dataclass
+from typing import Optional
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.config import settings
+from app.database.database import redis_client
+from app.Tables.UserTable import User, UserRole
+from app.utils.cache import LRUCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The slice of a user row that authentication and authorization need."""
+    id: int
+    role: Optional[UserRole]
+    is_active: bool
+
+
+class IdentityCache:
+    """
+    Principals keyed by user id: a short-lived in-process LRU in front of
+    Redis, filled from a three-column query on a miss. Committed changes to a
+    user's role or is_active (and deletes) remove the Redis entry and this
+    process's local one; other workers' local copies expire within
+    IDENTITY_CACHE_LOCAL_TTL_SECONDS. Redis failures fall back to the database.
+    """
+
+    def __init__(self, ttl: int, local_ttl: int, local_maxsize: int, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.local = LRUCache(local_maxsize, min(local_ttl, ttl))
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0, "redis_errors": 0}
+
+    def _redis_key(self, user_id: int) -> str:
+        return f"identity:{user_id}"
+
+    def get(self, user_id: int, db: Session) -> Optional[Principal]:
+        if not self.enabled:
+            return self._load(user_id, db)
+
+        principal = self.local.get(str(user_id))
+        if principal is not None:
+            self.counters["local_hits"] += 1
+            return principal
+
+        try:
+            raw = redis_client.get(self._redis_key(user_id))
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+            raw = None
+
+        if raw is not None:
+            self.counters["redis_hits"] += 1
+            data = json.loads(raw)
+            principal = Principal(data["id"], UserRole(data["role"]) if data["role"] else None, data["is_active"])
+            self.local.set(str(user_id), principal)
+            return principal
+
+        self.counters["misses"] += 1
+        principal = self._load(user_id, db)
+        if principal is not None:
+            self._store(principal)
+        return principal
+
+    def _load(self, user_id: int, db: Session) -> Optional[Principal]:
+        row = db.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        return Principal(row.id, row.role, bool(row.is_active))
+
+    def _store(self, principal: Principal):
+        self.local.set(str(principal.id), principal)
+        raw = json.dumps({
+            "id": principal.id,
+            "role": principal.role.value if principal.role else None,
+            "is_active": principal.is_active,
+        })
+        try:
+            redis_client.set(self._redis_key(principal.id), raw, ex=self.ttl)
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+    def invalidate(self, user_id: int):
+        self.counters["invalidations"] += 1
+        self.local.delete(str(user_id))
+        try:
+            redis_client.delete(self._redis_key(user_id))
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["misses"]
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        return {
+            "enabled": self.enabled,
+            "local_entries": len(self.local),
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+identity_cache = IdentityCache(
+    ttl=settings.IDENTITY_CACHE_TTL_SECONDS,
+    local_ttl=settings.IDENTITY_CACHE_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.IDENTITY_CACHE_LOCAL_MAXSIZE,
+    enabled=settings.IDENTITY_CACHE_ENABLED,
+)
+
+
+# Invalidation happens after commit, so a concurrent miss cannot re-cache the
+# pre-update row between the flush and the commit. Changes made with bulk
+# query.update()/delete() bypass these hooks and must call invalidate().
+
+_PENDING_KEY = "identity_invalidate"
+
+
+def _mark(target: User):
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.is_active.history.has_changes():
+        _mark(target)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User):
+    _mark(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_invalidations(session: Session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
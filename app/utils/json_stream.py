@@ -0,0 +1,69 @@
+import json
+from typing import Any, List, Tuple
+
+
+class TopLevelObjectParser:
+    """
+    Incremental parser for a single JSON object arriving in chunks.
+
+    `feed` returns every top-level (key, value) member that became complete
+    with the new text, so callers can act on `land_preparation` while the
+    model is still writing `irrigation_schedule`. Nested values are only
+    decoded once their closing bracket has arrived.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = -1
+        self.closed = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self.buffer += text
+        members = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    members.extend(self._take_member(self._member_start, i))
+                    self.closed = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                members.extend(self._take_member(self._member_start, i))
+                self._member_start = i + 1
+
+        self._pos = len(buf)
+        return members
+
+    def _take_member(self, start: int, end: int) -> List[Tuple[str, Any]]:
+        member = self.buffer[start:end].strip()
+        if not member:
+            return []
+        return list(json.loads("{" + member + "}").items())
+
+    def result(self) -> dict:
+        """The whole document; raises ValueError if the stream was cut short."""
+        if not self.closed:
+            raise ValueError("JSON stream ended before the object was closed")
+        return json.loads(self.buffer)
@@ -3,7 +3,10 @@ from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from typing import Optional
 import os
+import uuid
 from dotenv import load_dotenv
+from app.config import settings
+from app.utils.sessions import is_revoked, now_ms
 
 load_dotenv()
 
@@ -11,14 +14,22 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv('ALGORITHM')
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """Adds exp, iat (plus iat_ms) and a unique jti (the session id) to the claims."""
     to_encode = data.copy()
+    issued_ms = now_ms()
+    now = datetime.fromtimestamp(issued_ms / 1000, timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": issued_ms // 1000, "iat_ms": issued_ms, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM) #type:ignore
 
+def token_claims(token: str) -> dict:
+    """Claims of a token this process just issued, without re-verifying it."""
+    return jwt.get_unverified_claims(token)
+
+
 def verify_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +41,8 @@ def verify_token(token: str) -> dict:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]) #type:ignore
         if payload.get("sub") is None:
             raise credentials_exception
+        if is_revoked(payload):
+            raise credentials_exception
         return payload
     except JWTError:
         raise credentials_exception
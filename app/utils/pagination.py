@@ -0,0 +1,77 @@
+"""
+Keyset pagination for the per-user history lists.
+
+Every paginated endpoint takes `cursor` and `limit` query parameters and
+answers with the rows of one page, newest first. The cursor for the next
+page is sent in the X-Next-Cursor response header, which is left out on
+the last page; the body keeps the endpoint's usual shape.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+from app.config import settings
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    cursor: Optional[str]
+    limit: int
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+) -> PageParams:
+    return PageParams(cursor, limit)
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(stmt, model, page: PageParams):
+    """
+    Orders a per-user query newest first, matching the (user_id, created_at
+    DESC, id) indexes, and continues after `page.cursor`. One extra row is
+    fetched so `split_page` can tell whether another page exists.
+    Works on both select() statements and ORM Query objects.
+    """
+    if page.cursor:
+        created_at, id = decode_cursor(page.cursor)
+        stmt = stmt.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id > id),
+        ))
+    return stmt.order_by(model.created_at.desc(), model.id.asc()).limit(page.limit + 1)
+
+
+def split_page(rows: Sequence, page: PageParams) -> Tuple[List, Optional[str]]:
+    """The rows of this page and the cursor for the next one (None on the last page)."""
+    rows = list(rows)
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from passlib.context import CryptContext
+from app.config import settings
+
+# min/max rounds make verify_and_update report hashes made at any other cost,
+# so raising (or lowering) BCRYPT_ROUNDS upgrades users as they log in
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small dedicated process pool so hashing neither holds
+    the GIL nor occupies the threadpool that sync routes and DB work share.
+    At most `max_pending` operations may be queued or running; beyond that
+    `PasswordHasherBusy` is raised instead of letting the backlog grow.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.counters = {"completed": 0, "rejected": 0, "rehashed": 0, "errors": 0}
+        self._wait_seconds = 0.0
+        self._busy_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            result, busy = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, fn, *args
+            )
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        self.counters["completed"] += 1
+        self._busy_seconds += busy
+        self._wait_seconds += time.perf_counter() - started - busy
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hashes a batch as one task per worker, so a large import holds a
+        handful of admission slots rather than one per password.
+        """
+        if not passwords:
+            return []
+        size = -(-len(passwords) // self.workers)
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        if self._pending + len(chunks) > self.max_pending:
+            self.counters["rejected"] += 1
+            raise PasswordHasherBusy()
+
+        results = await asyncio.gather(*[self._run(_hash_many, chunk) for chunk in chunks])
+        return [hashed for chunk in results for hashed in chunk]
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new_hash); new_hash is set when the stored hash used another cost."""
+        verified, new_hash = await self._run(_verify_and_update, password, hashed)
+        if new_hash is not None:
+            self.counters["rehashed"] += 1
+        return verified, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        completed = self.counters["completed"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "queued": max(0, self._pending - self.workers),
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            **self.counters,
+            "avg_queue_wait_ms": round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+            "avg_hash_ms": round(self._busy_seconds / completed * 1000, 2) if completed else 0.0,
+        }
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+# separate pool for admin imports, sized to the machine, so a bulk upload
+# never queues behind (or in front of) interactive logins
+bulk_password_hasher = PasswordHasher(
+    workers=settings.BULK_PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def ahash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def averify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_update(password, hashed)
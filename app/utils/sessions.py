@@ -0,0 +1,115 @@
+import json
+import logging
+import time
+from typing import List, Optional
+import redis
+from fastapi import HTTPException, status
+from app.config import settings
+from app.database.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+# session:{jti}          -> {"user_id", "issued_at", "expires_at", ...}, expires with the token
+# user_sessions:{uid}    -> sorted set of the user's jtis scored by token expiry
+# revoked:{jti}          -> set by logout, kept until the token would have expired
+# revoked_before:{uid}   -> unix time in ms; tokens issued at or before it are revoked (logout everywhere)
+
+
+def _token_lifetime() -> int:
+    return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def issued_at_ms(payload: dict) -> int:
+    # iat is whole seconds; iat_ms tells apart tokens issued in the same second
+    if "iat_ms" in payload:
+        return int(payload["iat_ms"])
+    return int(payload.get("iat", 0)) * 1000
+
+
+def _unavailable(action: str, e: redis.RedisError) -> HTTPException:
+    logger.warning("Could not %s: %s", action, e)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Session store is unavailable, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+def register_session(user_id: int, jti: str, issued_at: int, expires_at: int, **meta):
+    """Records a freshly issued token; one pipelined round trip."""
+    ttl = max(1, expires_at - int(time.time()))
+    session = json.dumps({"jti": jti, "user_id": user_id, "issued_at": issued_at, "expires_at": expires_at, **meta})
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(f"session:{jti}", session, ex=ttl)
+        pipe.zadd(f"user_sessions:{user_id}", {jti: expires_at})
+        pipe.zremrangebyscore(f"user_sessions:{user_id}", "-inf", int(time.time()))
+        pipe.expire(f"user_sessions:{user_id}", _token_lifetime())
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not register session %s: %s", jti, e)
+
+
+def is_revoked(payload: dict) -> bool:
+    """
+    O(1) check of a decoded token: one MGET of its own revocation key and
+    the user's logout-everywhere cutoff.
+    """
+    jti = payload.get("jti")
+    user_id = payload.get("sub")
+    try:
+        revoked, revoked_before = redis_client.mget(f"revoked:{jti}", f"revoked_before:{user_id}")
+    except redis.RedisError as e:
+        logger.warning("Token revocation check failed: %s", e)
+        return not settings.SESSION_REVOCATION_FAIL_OPEN
+
+    if jti and revoked is not None:
+        return True
+    if revoked_before is not None:
+        # tokens from before sessions were tracked carry no iat
+        return issued_at_ms(payload) <= int(revoked_before)
+    return False
+
+
+def revoke(payload: dict):
+    """Revokes one token; answers 503 rather than reporting a logout that did not happen."""
+    jti = payload["jti"]
+    ttl = max(1, int(payload["exp"]) - int(time.time()))
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(f"revoked:{jti}", 1, ex=ttl)
+        pipe.delete(f"session:{jti}")
+        pipe.zrem(f"user_sessions:{payload['sub']}", jti)
+        pipe.execute()
+    except redis.RedisError as e:
+        raise _unavailable(f"revoke session {jti}", e)
+
+
+def revoke_all(user_id: int):
+    """
+    Revokes every token issued to the user so far. The cutoff is in
+    milliseconds, so a login right after (even in the same second) is
+    unaffected.
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(f"revoked_before:{user_id}", now_ms(), ex=_token_lifetime())
+        pipe.delete(f"user_sessions:{user_id}")
+        pipe.execute()
+    except redis.RedisError as e:
+        raise _unavailable(f"revoke sessions of user {user_id}", e)
+
+
+def list_sessions(user_id: int) -> List[dict]:
+    try:
+        jtis = redis_client.zrangebyscore(f"user_sessions:{user_id}", int(time.time()), "+inf")
+        if not jtis:
+            return []
+        sessions = redis_client.mget([f"session:{jti}" for jti in jtis])
+    except redis.RedisError as e:
+        raise _unavailable(f"list sessions of user {user_id}", e)
+    return [json.loads(s) for s in sessions if s is not None]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+import redis
+from app.database.database import async_redis_client
+
+# Delete the lock only if we still own it, so a slow leader whose lock
+# already expired cannot release a lock taken by another worker.
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+
+    Inside a worker, callers await the same task. Across uvicorn workers,
+    the first caller takes a Redis lock and publishes its result under a
+    short-lived result key that the other workers poll for. If Redis is
+    unavailable every worker simply makes its own call.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        lock_ttl: float,
+        result_ttl: int,
+        wait_timeout: float,
+        poll_interval: float = 0.25,
+        share_result: Callable[[Any], bool] = lambda result: True,
+    ):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.share_result = share_result
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"leaders": 0, "coalesced_local": 0, "coalesced_remote": 0, "redis_errors": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.counters["coalesced_local"] += 1
+
+        # shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            raw = await async_redis_client.get(result_key)
+            if raw is not None:
+                self.counters["coalesced_remote"] += 1
+                return json.loads(raw)
+            acquired = await async_redis_client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+            return await fn()
+
+        if acquired:
+            self.counters["leaders"] += 1
+            try:
+                result = await fn()
+                if self.share_result(result):
+                    await self._publish(result_key, result)
+                return result
+            finally:
+                await self._release(lock_key, token)
+
+        return await self._wait_for_leader(lock_key, result_key, fn)
+
+    async def _publish(self, result_key: str, result: Any):
+        try:
+            await async_redis_client.set(result_key, json.dumps(result), ex=self.result_ttl)
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+    async def _release(self, lock_key: str, token: str):
+        try:
+            await async_redis_client.eval(_RELEASE_LOCK, 1, lock_key, token) #type:ignore
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+    async def _wait_for_leader(self, lock_key: str, result_key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                raw = await async_redis_client.get(result_key)
+                if raw is not None:
+                    self.counters["coalesced_remote"] += 1
+                    return json.loads(raw)
+                if not await async_redis_client.exists(lock_key):
+                    break
+        except redis.RedisError:
+            self.counters["redis_errors"] += 1
+
+        # leader failed, timed out or did not share its result
+        return await fn()
+
+    def stats(self) -> dict:
+        return {
+            "namespace": self.namespace,
+            "in_flight": len(self._inflight),
+            **self.counters,
+        }
@@ -0,0 +1,128 @@
+"""
+Compares the old response path (jsonable_encoder + stdlib json) with the
+current one (Pydantic v2 models read from ORM rows + orjson) for the two
+largest payloads: a page of crop guidances and a full user profile.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --rows 100 --repeat 50
+
+Rows are built in memory, so no database is needed; only the settings in
+.env have to load.
+"""
+import argparse
+import datetime
+import timeit
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+import orjson
+from pydantic import TypeAdapter
+from app.Tables.CropGuidance import CropGuidances
+from app.Tables.GuidanceBlobs import GuidanceBlob
+from app.Tables.UserTable import User, UserRole, LandType, SoilType
+from app.utils.compression import deflate_segment
+from schema import CropGuidanceOut, UserProfileOut
+
+NOW = datetime.datetime(2025, 9, 18, 11, 52, 32, tzinfo=datetime.timezone.utc)
+
+
+def _guidance_response(i: int) -> dict:
+    """Roughly the size and nesting of a real Gemini guidance (~20 KB)."""
+    steps = [
+        {"step": s, "title": f"Stage {s}", "details": "Irrigate lightly and check soil moisture at 10 cm. " * 6,
+         "duration_days": 7 + s, "inputs": ["urea", "dap", "potash"]}
+        for s in range(25)
+    ]
+    return {
+        "crop_overview": "Wheat is a rabi crop suited to loamy soils. " * 10,
+        "land_preparation": {"ploughing": "Two deep ploughings. " * 8, "levelling": "Laser levelling. " * 8},
+        "fertilizer_plan": [{"stage": s, "dose_kg_per_acre": 12.5 + s, "product": "NPK 12:32:16"} for s in range(10)],
+        "economic_analysis": {"cost": 42000 + i, "revenue": 91000.5, "profit_margin": 0.53},
+        "risk_factors": ["Rust", "Aphids", "Terminal heat", "Lodging"] * 3,
+        "step_by_step_guide": steps,
+        "summary": "Sow in mid November, irrigate at crown root initiation and flowering.",
+    }
+
+
+def guidance_rows(n: int) -> List[CropGuidances]:
+    return [
+        CropGuidances(
+            id=i, user_id=1, crop_name="Wheat", land_size=5.0, soil_type="Loamy", location="Punjab, India",
+            irrigation_method="Drip", fertilizer={"type": "Urea", "amount": 50.0, "schedule": "Basal"},
+            equipment="Tractor", planting_date=datetime.date(2025, 11, 15), growing_season="Rabi",
+            blob=GuidanceBlob(content=deflate_segment(orjson.dumps(_guidance_response(i)))),
+            created_at=NOW, updated_at=NOW,
+        )
+        for i in range(n)
+    ]
+
+
+def profile_user() -> User:
+    user = User(id=1, email="farmer@example.com", phone_number="9876543210", full_name="Ram Kumar",
+                password_hash="x", terms_and_condition_followed=True, role=UserRole.FARMER,
+                primary_land_type=LandType.IRRIGATED, primary_soil_type=SoilType.ALLUVIAL,
+                created_at=NOW, updated_at=NOW, last_login=NOW)
+    for column in User.__table__.columns:
+        if getattr(user, column.key) is None and column.default is not None and not callable(column.default.arg):
+            setattr(user, column.key, column.default.arg)
+    for column in User.__table__.columns:
+        if getattr(user, column.key) is None and column.type.python_type is str:
+            setattr(user, column.key, "x" * min(getattr(column.type, "length", None) or 40, 40))
+    return user
+
+
+def _before_guidance(rows) -> bytes:
+    # what FastAPI did for a route without a response_model
+    return JSONResponse(jsonable_encoder(rows)).body
+
+
+def legacy_guidance_rows(rows: List[CropGuidances]) -> List[dict]:
+    """The rows as they were read when guidance_response was an inline JSONB column."""
+    columns = [c.key for c in CropGuidances.__table__.columns if c.key != "guidance_sha256"]
+    return [{**{key: getattr(row, key) for key in columns}, "guidance_response": row.guidance_response} for row in rows]
+
+
+_guidance_list = TypeAdapter(List[CropGuidanceOut])
+
+
+def _after_guidance(rows) -> bytes:
+    # validate + dump in pydantic-core, render with orjson
+    return ORJSONResponse(
+        _guidance_list.dump_python(_guidance_list.validate_python(rows, from_attributes=True), mode="json", exclude_unset=True)
+    ).body
+
+
+def _before_profile(user) -> bytes:
+    return JSONResponse(jsonable_encoder(UserProfileOut.model_validate(user))).body
+
+
+def _after_profile(user) -> bytes:
+    return ORJSONResponse(UserProfileOut.model_validate(user).model_dump(mode="json")).body
+
+
+def _best_ms(fn, arg, repeat: int) -> float:
+    return min(timeit.repeat(lambda: fn(arg), number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20, help="guidances per page (default: the page size)")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    rows = guidance_rows(args.rows)
+    user = profile_user()
+    cases = [
+        (f"guidance page ({args.rows} rows)", legacy_guidance_rows(rows), rows, _before_guidance, _after_guidance),
+        ("user profile", user, user, _before_profile, _after_profile),
+    ]
+    print(f"{'payload':<26}{'bytes':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, before_payload, payload, before, after in cases:
+        size = len(after(payload))
+        before_ms = _best_ms(before, before_payload, args.repeat)
+        after_ms = _best_ms(after, payload, args.repeat)
+        print(f"{name:<26}{size:>10}{before_ms:>12.3f}{after_ms:>12.3f}{before_ms / after_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,170 +1,187 @@
-import requests
 import json
-from typing import Dict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from schema import CropFormRequest
+from app.config import settings
+from app.utils.gemini_client import agenerate_content, generate_content, astream_generate_content
+from app.utils.json_stream import TopLevelObjectParser
+from app.utils.cache import ResponseCache, canonical_key
+from app.utils.singleflight import SingleFlight
 
-def call_gemini(crop_data: dict, api_key: str, model: str = "gemini-2.5-flash") -> dict:
-    """
-    Send crop data to Gemini API and get structured agricultural advice.
-    The response will strictly contain all of these keys:
-    predicted_crop, suitability_score, best_planting_time, harvest_period,
-    water_requirements, fertilizer_recommendations, soil_condition,
-    expected_yield, expected_market_price, risk_factors, summary
-    """
+# Bump these whenever the prompt text or required keys change so that
+# cached responses built from the old prompt are no longer served.
+CROP_PROMPT_VERSION = "crop-v1"
+YIELD_PROMPT_VERSION = "yield-v1"
+GUIDANCE_PROMPT_VERSION = "guidance-v1"
+CANDIDATES_PROMPT_VERSION = "candidates-v1"
+SWEEP_PROMPT_VERSION = "sweep-v1"
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key
-    }
+CROP_REQUIRED_KEYS = [
+    "predicted_crop",
+    "suitability_score",
+    "best_planting_time",
+    "harvest_period",
+    "water_requirements",
+    "fertilizer_recommendations",
+    "soil_condition",
+    "expected_yield",
+    "expected_market_price",
+    "risk_factors",
+    "summary"
+]
+
+YIELD_REQUIRED_KEYS = [
+    "item",
+    "area",
+    "year",
+    "predicted_yield",
+    "unit",
+    "predicted_crop",
+    "suitability_score",
+    "best_planting_time",
+    "harvest_period",
+    "water_requirements",
+    "fertilizer_recommendations",
+    "soil_condition",
+    "expected_yield",
+    "expected_market_price",
+    "risk_factors",
+    "summary"
+]
 
-    required_keys = [
-        "predicted_crop",
-        "suitability_score",
-        "best_planting_time",
-        "harvest_period",
-        "water_requirements",
-        "fertilizer_recommendations",
-        "soil_condition",
-        "expected_yield",
-        "expected_market_price",
-        "risk_factors",
-        "summary"
-    ]
+SWEEP_REQUIRED_KEYS = [
+    "summary",
+    "most_sensitive_factor",
+    "best_scenario",
+    "recommendations"
+]
 
+GUIDANCE_REQUIRED_KEYS = [
+    "predicted_crop","suitability_score","best_planting_time","land_preparation",
+    "soil_testing","seed_selection","seed_treatment","planting_method",
+    "irrigation_schedule","fertilizer_plan","pest_disease_management","weed_control",
+    "crop_monitoring","pruning_training","growth_stage_guidance","harvest_timing",
+    "post_harvest_handling","storage_solutions","expected_yield","expected_market_price",
+    "economic_analysis","risk_factors","equipment_guidance","step_by_step_guide","summary",
+]
+
+
+crop_cache = ResponseCache(
+    "gemini:crop",
+    ttl=settings.GEMINI_CACHE_TTL_SECONDS,
+    local_ttl=settings.GEMINI_CACHE_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.GEMINI_CACHE_LOCAL_MAXSIZE,
+    enabled=settings.GEMINI_CACHE_ENABLED,
+)
+
+yield_cache = ResponseCache(
+    "gemini:yield",
+    ttl=settings.GEMINI_CACHE_TTL_SECONDS,
+    local_ttl=settings.GEMINI_CACHE_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.GEMINI_CACHE_LOCAL_MAXSIZE,
+    enabled=settings.GEMINI_CACHE_ENABLED,
+)
+
+# Identical prompts that are in flight at the same time share one upstream
+# call. The lock outlives the longest call so waiters never start a duplicate.
+gemini_flight = SingleFlight(
+    "gemini:flight",
+    lock_ttl=settings.GEMINI_GUIDANCE_TIMEOUT_SECONDS + 10,
+    result_ttl=settings.GEMINI_SINGLEFLIGHT_RESULT_TTL_SECONDS,
+    wait_timeout=settings.GEMINI_GUIDANCE_TIMEOUT_SECONDS + 10,
+    poll_interval=settings.GEMINI_SINGLEFLIGHT_POLL_INTERVAL_SECONDS,
+    share_result=lambda result: "error" not in result,
+)
+
+
+def _crop_body(crop_data: dict) -> dict:
     instruction = {
         "role": "user",
         "parts": [{
             "text": (
                 "You are an agriculture expert. Based on the following crop data, "
                 "respond ONLY in valid JSON format with exactly these keys:\n\n"
-                f"{required_keys}\n\n"
+                f"{CROP_REQUIRED_KEYS}\n\n"
                 f"Crop Data:\n{json.dumps(crop_data)}"
             )
         }]
     }
 
-    body = {
+    return {
         "contents": [instruction],
         "generationConfig": {
             "response_mime_type": "application/json"
         }
     }
 
-    resp = requests.post(url, headers=headers, json=body)
-
-    if resp.status_code != 200:
-        raise Exception(f"Gemini API error {resp.status_code}: {resp.text}")
 
-    data = resp.json()
-    try:
-        response_text = data["candidates"][0]["content"]["parts"][0]["text"]
-        parsed = json.loads(response_text)
-
-        for key in required_keys:
-            if key not in parsed:
-                parsed[key] = "N/A"
-
-        return parsed
-
-    except Exception:
-        return {"error": "Failed to parse Gemini response", "raw": data}
-    
-def call_gemini_yield(yield_data: dict, api_key: str, model: str = "gemini-2.5-flash") -> Dict:
-    """
-    Send yield prediction data to Gemini API for enriched agricultural advice.
-    The response will strictly contain these keys:
-    item, area, year, predicted_yield, unit,
-    predicted_crop, suitability_score, best_planting_time, harvest_period,
-    water_requirements, fertilizer_recommendations, soil_condition,
-    expected_yield, expected_market_price, risk_factors, summary
-    """
+def _candidates_body(candidates_data: dict) -> dict:
+    instruction = {
+        "role": "user",
+        "parts": [{
+            "text": (
+                "You are an agriculture expert. A model ranked the candidate crops below for "
+                "this soil and weather data. Respond ONLY in valid JSON as an object with a single "
+                "key \"candidates\": a list with one entry per candidate crop, in the same order, "
+                "each with exactly these keys:\n\n"
+                f"{CROP_REQUIRED_KEYS}\n\n"
+                f"Data:\n{json.dumps(candidates_data)}"
+            )
+        }]
+    }
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key
+    return {
+        "contents": [instruction],
+        "generationConfig": {
+            "response_mime_type": "application/json"
+        }
     }
 
-    required_keys = [
-        "item",
-        "area",
-        "year",
-        "predicted_yield",
-        "unit",
-        "predicted_crop",
-        "suitability_score",
-        "best_planting_time",
-        "harvest_period",
-        "water_requirements",
-        "fertilizer_recommendations",
-        "soil_condition",
-        "expected_yield",
-        "expected_market_price",
-        "risk_factors",
-        "summary"
-    ]
 
+def _yield_body(yield_data: dict) -> dict:
     instruction = {
         "role": "user",
         "parts": [{
             "text": (
                 "You are an agriculture expert. Based on the following yield prediction data, "
                 "respond ONLY in valid JSON format with exactly these keys:\n\n"
-                f"{required_keys}\n\n"
+                f"{YIELD_REQUIRED_KEYS}\n\n"
                 f"Yield Data:\n{json.dumps(yield_data)}"
             )
         }]
     }
 
-    body = {
+    return {
         "contents": [instruction],
         "generationConfig": {
             "response_mime_type": "application/json"
         }
     }
 
-    resp = requests.post(url, headers=headers, json=body)
-
-    if resp.status_code != 200:
-        raise Exception(f"Gemini API error {resp.status_code}: {resp.text}")
-
-    data = resp.json()
-    try:
-        response_text = data["candidates"][0]["content"]["parts"][0]["text"]
-        parsed = json.loads(response_text)
-
-        for key in required_keys:
-            if key not in parsed:
-                parsed[key] = "N/A"
-
-        return parsed
 
-    except Exception:
-        return {"error": "Failed to parse Gemini response", "raw": data}
-    
-def call_gemini_for_guidance(
-    crop_request: CropFormRequest, 
-    api_key: str, 
-    model: str = "gemini-2.5-flash"
-) -> dict:
-    import json, requests
+def _sweep_body(sweep_data: dict) -> dict:
+    instruction = {
+        "role": "user",
+        "parts": [{
+            "text": (
+                "You are an agriculture expert. The data below is a what-if sweep of predicted crop "
+                "yield (hg/ha) over ranges of rainfall, temperature, pesticide use and year, with the "
+                "mean yield along each swept factor. Explain it for a farmer and respond ONLY in valid "
+                "JSON format with exactly these keys:\n\n"
+                f"{SWEEP_REQUIRED_KEYS}\n\n"
+                f"Sweep Data:\n{json.dumps(sweep_data)}"
+            )
+        }]
+    }
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key
+    return {
+        "contents": [instruction],
+        "generationConfig": {
+            "response_mime_type": "application/json"
+        }
     }
 
-    required_keys = [
-        "predicted_crop","suitability_score","best_planting_time","land_preparation",
-        "soil_testing","seed_selection","seed_treatment","planting_method",
-        "irrigation_schedule","fertilizer_plan","pest_disease_management","weed_control",
-        "crop_monitoring","pruning_training","growth_stage_guidance","harvest_timing",
-        "post_harvest_handling","storage_solutions","expected_yield","expected_market_price",
-        "economic_analysis","risk_factors","equipment_guidance","step_by_step_guide","summary",
-    ]
 
+def _guidance_body(crop_request: CropFormRequest) -> dict:
     crop_json = json.dumps(crop_request.dict())
 
     instruction = {
@@ -173,14 +190,14 @@ def call_gemini_for_guidance(
             "text": (
                 "You are a world-class agriculture expert. Generate a JSON "
                 f"guide for the following crop data:\n\n{crop_json}\n\n"
-                f"Required keys: {required_keys}\n\n"
+                f"Required keys: {GUIDANCE_REQUIRED_KEYS}\n\n"
                 "Include practical advice for all crop lifecycle stages, "
                 "ensure valid JSON and geniune explanations with all the required keys present in response."
             )
         }]
     }
 
-    body = {
+    return {
         "contents": [instruction],
         "generationConfig": {
             "response_mime_type": "application/json",
@@ -189,16 +206,206 @@ def call_gemini_for_guidance(
         }
     }
 
-    resp = requests.post(url, headers=headers, json=body)
-    if resp.status_code != 200:
-        raise Exception(f"Gemini API error {resp.status_code}: {resp.text}")
 
-    data = resp.json()
+def _parse_response(data: dict, required_keys: list) -> dict:
     try:
         response_text = data["candidates"][0]["content"]["parts"][0]["text"]
         parsed = json.loads(response_text)
+
         for key in required_keys:
             parsed.setdefault(key, "N/A")
+
         return parsed
+
     except Exception:
         return {"error": "Failed to parse Gemini response", "raw": data}
+
+
+def call_gemini(crop_data: dict, api_key: str, model: str = "gemini-2.5-flash", timeout: Optional[float] = None) -> dict:
+    """
+    Send crop data to Gemini API and get structured agricultural advice.
+    The response will strictly contain all of these keys:
+    predicted_crop, suitability_score, best_planting_time, harvest_period,
+    water_requirements, fertilizer_recommendations, soil_condition,
+    expected_yield, expected_market_price, risk_factors, summary
+    """
+    data = generate_content(_crop_body(crop_data), api_key, model, timeout)
+    return _parse_response(data, CROP_REQUIRED_KEYS)
+
+
+async def acall_gemini(crop_data: dict, api_key: str, model: str = "gemini-2.5-flash", timeout: Optional[float] = None) -> dict:
+    """
+    Async version of `call_gemini` using the shared pooled client.
+    Successful responses are cached by a hash of (model, prompt version, input).
+    """
+    key = canonical_key(model, CROP_PROMPT_VERSION, crop_data)
+    cached = await crop_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        data = await agenerate_content(_crop_body(crop_data), api_key, model, timeout)
+        parsed = _parse_response(data, CROP_REQUIRED_KEYS)
+        if "error" not in parsed:
+            await crop_cache.set(key, parsed)
+        return parsed
+
+    return await gemini_flight.do(key, fetch)
+
+
+async def acall_gemini_candidates(
+    soil_data: dict,
+    candidates: list,
+    api_key: str,
+    model: str = "gemini-2.5-flash",
+    timeout: Optional[float] = None
+) -> list:
+    """
+    Enriches several ranked crops in one Gemini round trip. Returns one dict
+    per candidate, in order, each with the `call_gemini` keys.
+    """
+    candidates_data = {**soil_data, "candidates": candidates}
+    key = canonical_key(model, CANDIDATES_PROMPT_VERSION, candidates_data)
+    cached = await crop_cache.get(key)
+    if cached is not None:
+        return cached["candidates"]
+
+    async def fetch():
+        data = await agenerate_content(_candidates_body(candidates_data), api_key, model, timeout)
+        parsed = _parse_response(data, ["candidates"])
+        if "error" in parsed:
+            return parsed
+
+        entries = parsed["candidates"] if isinstance(parsed["candidates"], list) else []
+        enriched = []
+        for i, candidate in enumerate(candidates):
+            entry = entries[i] if i < len(entries) and isinstance(entries[i], dict) else {}
+            for k in CROP_REQUIRED_KEYS:
+                entry.setdefault(k, "N/A")
+            enriched.append({**entry, **candidate})
+
+        result = {"candidates": enriched}
+        await crop_cache.set(key, result)
+        return result
+
+    result = await gemini_flight.do(key, fetch)
+    if "error" in result:
+        raise Exception(result["error"])
+    return result["candidates"]
+
+
+def call_gemini_yield(yield_data: dict, api_key: str, model: str = "gemini-2.5-flash", timeout: Optional[float] = None) -> Dict:
+    """
+    Send yield prediction data to Gemini API for enriched agricultural advice.
+    The response will strictly contain these keys:
+    item, area, year, predicted_yield, unit,
+    predicted_crop, suitability_score, best_planting_time, harvest_period,
+    water_requirements, fertilizer_recommendations, soil_condition,
+    expected_yield, expected_market_price, risk_factors, summary
+    """
+    data = generate_content(_yield_body(yield_data), api_key, model, timeout)
+    return _parse_response(data, YIELD_REQUIRED_KEYS)
+
+
+async def acall_gemini_yield(yield_data: dict, api_key: str, model: str = "gemini-2.5-flash", timeout: Optional[float] = None) -> Dict:
+    """
+    Async version of `call_gemini_yield` using the shared pooled client.
+    Successful responses are cached by a hash of (model, prompt version, input).
+    """
+    key = canonical_key(model, YIELD_PROMPT_VERSION, yield_data)
+    cached = await yield_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        data = await agenerate_content(_yield_body(yield_data), api_key, model, timeout)
+        parsed = _parse_response(data, YIELD_REQUIRED_KEYS)
+        if "error" not in parsed:
+            await yield_cache.set(key, parsed)
+        return parsed
+
+    return await gemini_flight.do(key, fetch)
+
+
+async def acall_gemini_sweep_summary(sweep_data: dict, api_key: str, model: str = "gemini-2.5-flash", timeout: Optional[float] = None) -> Dict:
+    """
+    One summary for a whole yield sweep, with these keys:
+    summary, most_sensitive_factor, best_scenario, recommendations
+    """
+    key = canonical_key(model, SWEEP_PROMPT_VERSION, sweep_data)
+    cached = await yield_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        data = await agenerate_content(_sweep_body(sweep_data), api_key, model, timeout)
+        parsed = _parse_response(data, SWEEP_REQUIRED_KEYS)
+        if "error" not in parsed:
+            await yield_cache.set(key, parsed)
+        return parsed
+
+    return await gemini_flight.do(key, fetch)
+
+
+def call_gemini_for_guidance(
+    crop_request: CropFormRequest,
+    api_key: str,
+    model: str = "gemini-2.5-flash",
+    timeout: Optional[float] = None
+) -> dict:
+    data = generate_content(
+        _guidance_body(crop_request), api_key, model,
+        timeout or settings.GEMINI_GUIDANCE_TIMEOUT_SECONDS
+    )
+    return _parse_response(data, GUIDANCE_REQUIRED_KEYS)
+
+
+async def acall_gemini_for_guidance(
+    crop_request: CropFormRequest,
+    api_key: str,
+    model: str = "gemini-2.5-flash",
+    timeout: Optional[float] = None
+) -> dict:
+    """
+    Async version of `call_gemini_for_guidance` using the shared pooled client.
+    Concurrent requests for the same crop form share a single Gemini call.
+    """
+    key = canonical_key(model, GUIDANCE_PROMPT_VERSION, crop_request.dict())
+
+    async def fetch():
+        data = await agenerate_content(
+            _guidance_body(crop_request), api_key, model,
+            timeout or settings.GEMINI_GUIDANCE_TIMEOUT_SECONDS
+        )
+        return _parse_response(data, GUIDANCE_REQUIRED_KEYS)
+
+    return await gemini_flight.do(key, fetch)
+
+
+async def astream_gemini_for_guidance(
+    crop_request: CropFormRequest,
+    api_key: str,
+    model: str = "gemini-2.5-flash",
+    timeout: Optional[float] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of `call_gemini_for_guidance`. Yields each top-level
+    (key, value) of the guidance as soon as Gemini has finished writing it,
+    then "N/A" for any required key the model left out.
+    """
+    parser = TopLevelObjectParser()
+    seen = set()
+
+    async for text in astream_generate_content(
+        _guidance_body(crop_request), api_key, model,
+        timeout or settings.GEMINI_GUIDANCE_TIMEOUT_SECONDS
+    ):
+        for key, value in parser.feed(text):
+            seen.add(key)
+            yield key, value
+
+    parser.result()
+
+    for key in GUIDANCE_REQUIRED_KEYS:
+        if key not in seen:
+            yield key, "N/A"
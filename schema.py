@@ -1,7 +1,8 @@
 from datetime import date, datetime
-from pydantic import BaseModel, validator, Field, EmailStr
+import json
+from pydantic import BaseModel, ConfigDict, validator, field_validator, Field, EmailStr
 from pydantic import constr, conint, confloat
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 # -------- ChatBot -----------
@@ -28,6 +29,49 @@ class YieldPredictionRequest(BaseModel):
     Area: str
     Item: str
 
+class SweepRange(BaseModel):
+    """Evenly spaced values from start to stop (inclusive)"""
+    start: float
+    stop: float
+    steps: int = Field(5, ge=1, le=200)
+
+class YieldSweepRequest(BaseModel):
+    """What-if grid around a base request; axes left out stay at the base value"""
+    base: YieldPredictionRequest
+    Year: Optional[SweepRange] = None
+    average_rain_fall_mm_per_year: Optional[SweepRange] = None
+    pesticides_tonnes: Optional[SweepRange] = None
+    avg_temp: Optional[SweepRange] = None
+    summarize: bool = False
+
+# Listing models read straight from ORM rows (or column-select rows, see
+# view=summary); fields a summary row does not have are left unset and
+# dropped by response_model_exclude_unset.
+
+class YieldPredictionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    item: Optional[str] = None
+    area: Optional[str] = None
+    year: Optional[int] = None
+    predicted_yield: Optional[int] = None
+    unit: Optional[str] = None
+    predicted_crop: Optional[str] = None
+    suitability_score: Optional[str] = None
+    best_planting_time: Optional[str] = None
+    harvest_period: Optional[str] = None
+    water_requirements: Optional[str] = None
+    fertilizer_recommendations: Optional[str] = None
+    soil_condition: Optional[str] = None
+    expected_yield: Optional[str] = None
+    expected_market_price: Optional[str] = None
+    summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class YieldPredictionPage(BaseModel):
+    yield_predictions: List[YieldPredictionOut]
+
 # ------------ Crop Recommendation ---------
 
 class CropRequest(BaseModel):
@@ -40,6 +84,45 @@ class CropRequest(BaseModel):
     Ph: float
     Rainfall: float
 
+class CropBatchRequest(BaseModel):
+    """Many soil samples scored in one model pass; enrich=False skips Gemini"""
+    samples: List[CropRequest] = Field(..., min_length=1)
+    enrich: bool = False
+
+class RecommendationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    predicted_crop: Optional[str] = None
+    suitability_score: Optional[str] = None
+    best_planting_time: Optional[str] = None
+    harvest_period: Optional[str] = None
+    water_requirements: Optional[str] = None
+    fertilizer_recommendations: Optional[str] = None
+    soil_condition: Optional[str] = None
+    expected_yield: Optional[str] = None
+    expected_market_price: Optional[str] = None
+    risk_factors: Optional[Any] = None
+    summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @field_validator("risk_factors", mode="before")
+    @classmethod
+    def parse_risk_factors(cls, value):
+        # stored as a JSON string in a Text column; empty, "null" and
+        # pre-JSON free-text values keep the list shape clients expect
+        if isinstance(value, str):
+            if not value.strip():
+                return []
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return [value]
+        return value if value is not None else []
+
+class RecommendationPage(BaseModel):
+    recommendations: List[RecommendationOut]
+
 # ---------- User Create ---------------
 
 class GenderEnum(str, Enum):
@@ -97,8 +180,7 @@ class UserBase(BaseModel):
     email: EmailStr
     role: UserRole = UserRole.FARMER
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserCreate(UserBase):
     password: str = Field(..., min_length=6)
@@ -234,8 +316,7 @@ class UserProfileOut(BaseModel):
     updated_at: datetime
     last_profile_update: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # class UserLoginResponse(UserBase):
 #     id: int
@@ -296,6 +377,20 @@ class FeedbackCreate(BaseModel):
     category: str
     comment: str
 
+class FeedbackOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    rating: Optional[int]
+    comment: Optional[str]
+    category: Optional[str]
+    created_at: Optional[datetime]
+
+class FeedbackPage(BaseModel):
+    message: Optional[str] = None
+    feedbacks: List[FeedbackOut]
+
 # ---------- Notifications ---------
 
 class NotificationCreate(BaseModel):
@@ -311,8 +406,7 @@ class NotificationResponse(BaseModel):
     is_read: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ------------- Crop Guidance ----------
 
@@ -334,3 +428,36 @@ class CropFormRequest(BaseModel):
 
 class CropGuidanceResponse(BaseModel):
     guidance: Dict
+
+class CropGuidanceOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: Optional[int] = None
+    crop_name: Optional[str] = None
+    land_size: Optional[float] = None
+    soil_type: Optional[str] = None
+    location: Optional[str] = None
+    irrigation_method: Optional[str] = None
+    fertilizer: Optional[Dict] = None
+    equipment: Optional[str] = None
+    planting_date: Optional[date] = None
+    growing_season: Optional[str] = None
+    guidance_response: Optional[Dict] = None
+    summary: Optional[Any] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# ------------- Sessions ----------
+
+class SessionOut(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    jti: str
+    user_id: int
+    issued_at: int
+    expires_at: int
+    current: bool = False
+
+class SessionList(BaseModel):
+    sessions: List[SessionOut]
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# model paths in app/ml are relative to the repo root
+os.chdir(ROOT)
+
+# app.config.Settings requires these; a real .env or environment still wins
+for name, value in {
+    "GEMINI_API_KEY": "test", "LANGCHAIN_PROJECT": "test", "OPENAI_API_KEY": "test",
+    "LANGCHAIN_TRACING_V2": "false", "LANGCHAIN_ENDPOINT": "http://localhost", "LANGCHAIN_API_KEY": "test",
+    "DATABASE_HOSTNAME": "localhost", "DATABASE_PORT": "5432", "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test", "DATABASE_USERNAME": "test", "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "MAIL_USERNAME": "test", "MAIL_PASSWORD": "test", "MAIL_FROM": "test@example.com",
+    "MAIL_PORT": "25", "MAIL_SERVER": "localhost",
+}.items():
+    os.environ.setdefault(name, value)
+
+# compiled model bundles built during the tests stay out of app/Model
+os.environ.setdefault("MODEL_CACHE_DIR", tempfile.mkdtemp(prefix="kisanmitra-models-"))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import BigInteger, create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+
+# The models target Postgres; these let the same tables be created in SQLite.
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_on_sqlite(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    return "INTEGER"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A SQLite file holding every table of the app."""
+    import app.main  # noqa: F401  registers every model on Base
+    from app.database.database import Base
+
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def db_sessionmaker(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def async_db_sessionmaker(db_path):
+    # NullPool: no aiosqlite connection outlives the event loop that opened it
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    import fakeredis
+    from app.routes import authRoutes
+    from app.utils import identity, sessions
+
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    for module in (authRoutes, identity, sessions):
+        monkeypatch.setattr(module, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def client(db_sessionmaker, async_db_sessionmaker, fake_redis):
+    """The app, with get_db and get_async_db served from the SQLite database."""
+    from app.main import app
+    from app.database.database import get_db, get_async_db
+
+    def _get_db():
+        db = db_sessionmaker()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def _get_async_db():
+        async with async_db_sessionmaker() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_async_db] = _get_async_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
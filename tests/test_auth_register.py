@@ -0,0 +1,66 @@
+import pytest
+from app.routes import authRoutes
+from app.Tables.UserTable import User, UserRole
+from app.utils.passwords import password_hasher
+
+PASSWORD = "secret123"
+
+
+def _user(n: int) -> dict:
+    return {
+        "email": f"farmer{n}@example.com", "full_name": f"Farmer {n}", "password": PASSWORD,
+        "confirm_password": PASSWORD, "terms_and_condition_followed": True,
+        "phone_number": f"98765432{n:02d}", "aadhaar_number": f"1234123412{n:02d}",
+        "current_village": "Village", "current_taluka": "Taluka", "current_district": "District",
+        "current_state": "State", "current_pincode": "123456", "total_land_holdings": 1.0,
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_process(monkeypatch):
+    # what a newly started worker sees, whatever earlier tests registered
+    monkeypatch.setattr(authRoutes, "_users_exist", False)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def stop_password_hasher():
+    yield
+    password_hasher.shutdown()
+
+
+def _register(client, n: int) -> dict:
+    response = client.post("/auth/register", json=_user(n))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _login(client, n: int):
+    user = _user(n)
+    return client.post("/auth/login", json={"phone_number": user["phone_number"], "email": user["email"], "password": PASSWORD})
+
+
+def test_first_user_is_admin_and_later_users_are_farmers(client):
+    assert _register(client, 1)["role"] == UserRole.ADMIN.value
+    assert _register(client, 2)["role"] == UserRole.FARMER.value
+
+
+def test_fresh_worker_registers_farmers_when_users_exist(client, db_sessionmaker, monkeypatch):
+    _register(client, 1)
+    # a second worker has not seen any registration yet
+    monkeypatch.setattr(authRoutes, "_users_exist", False)
+
+    assert _register(client, 2)["role"] == UserRole.FARMER.value
+    with db_sessionmaker() as db:
+        roles = dict(db.query(User.email, User.role))
+    assert roles == {"farmer1@example.com": UserRole.ADMIN, "farmer2@example.com": UserRole.FARMER}
+
+    response = _login(client, 2)
+    assert response.status_code == 200, response.text
+    assert response.json()["role"] == UserRole.FARMER.value
+
+
+def test_duplicate_registration_is_rejected(client):
+    _register(client, 1)
+    response = client.post("/auth/register", json=_user(1))
+    assert response.status_code == 400
+    assert response.json()["detail"].endswith("already registered")
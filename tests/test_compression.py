@@ -0,0 +1,168 @@
+import gzip
+import os
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.utils import compression
+from app.utils.compression import (
+    CompressionMiddleware, accepted_encodings, accepts_gzip, crc32_combine,
+    deflate_segment, gzip_from_segments, inflate_segment,
+)
+
+BIG_JSON = b'{"rows":[' + b",".join(b'{"id":%d,"crop":"Wheat"}' % i for i in range(200)) + b"]}"
+
+
+# ---- stored gzip segments ----
+
+@pytest.mark.parametrize("parts", [
+    [b""],
+    [b"hello"],
+    [b"[", b"", b'{"a":1}', b",", os.urandom(70000), b"]"],
+    [BIG_JSON] * 5,
+])
+def test_gzip_from_segments_is_one_valid_member(parts):
+    body = gzip_from_segments(deflate_segment(part, level) for part, level in zip(parts, [1, 6, 9] * len(parts)))
+    assert gzip.decompress(body) == b"".join(parts)
+    # one member: a single decompressobj consumes everything, trailer included
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    assert decompressor.decompress(body) == b"".join(parts)
+    assert decompressor.eof and not decompressor.unused_data
+
+
+@pytest.mark.parametrize("first, second", [(b"", b""), (b"abc", b""), (b"", b"abc"), (b"x" * 1000, os.urandom(4097))])
+def test_crc32_combine_matches_zlib(first, second):
+    assert crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second)) == zlib.crc32(first + second)
+
+
+def test_inflate_segment_round_trips_and_rejects_corruption():
+    segment = deflate_segment(BIG_JSON, 9)
+    assert inflate_segment(segment) == BIG_JSON
+
+    corrupt = bytearray(segment)
+    corrupt[0] ^= 0xFF  # crc
+    with pytest.raises(ValueError):
+        inflate_segment(bytes(corrupt))
+
+
+# ---- content negotiation ----
+
+@pytest.mark.parametrize("header, expected", [
+    (None, []),
+    ("", []),
+    ("gzip", ["gzip"]),
+    ("GZip, Deflate, br", ["gzip", "deflate", "br"]),
+    ("br;q=1.0, gzip;q=0.8, *;q=0.1", ["br", "gzip", "*"]),
+    ("gzip;q=0, br", ["br"]),
+    ("gzip; q=0.000, identity", ["identity"]),
+])
+def test_accepted_encodings(header, expected):
+    assert accepted_encodings(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [("gzip", True), ("*", True), ("br", False), ("gzip;q=0", False), (None, False)])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+# ---- middleware ----
+
+def _client(**options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/json")
+    def json_body():
+        return Response(BIG_JSON, media_type="application/json")
+
+    @app.get("/small")
+    def small_body():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/stored")
+    def stored():
+        return Response(gzip.compress(BIG_JSON), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/csv")
+    def csv():
+        return StreamingResponse((b"row,%d\n" % i for i in range(3)), media_type="text/csv")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([b"data: 1\n\n"]), media_type="text/event-stream")
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse("x" * 4096, headers={"Vary": "Origin"})
+
+    app.add_middleware(CompressionMiddleware, **{"content_types": ["application/json", "text/csv", "text/plain"], **options})
+    return TestClient(app)
+
+
+def _raw(client, path: str, accept_encoding: str):
+    # stream=True keeps httpx from decoding, so the wire bytes can be checked
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred_when_accepted():
+    response, body = _raw(_client(), "/json", "gzip, br")
+    assert response.headers["content-encoding"] == "br"
+    assert compression.brotli.decompress(body) == BIG_JSON
+
+
+def test_gzip_when_brotli_is_not_accepted():
+    response, body = _raw(_client(), "/json", "gzip, br;q=0")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == BIG_JSON
+
+
+def test_gzip_when_brotli_is_missing(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response, body = _raw(_client(), "/json", "br, gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BIG_JSON
+
+
+@pytest.mark.parametrize("accept_encoding", ["", "identity", "deflate", "gzip;q=0"])
+def test_no_acceptable_coding_passes_through(accept_encoding):
+    response, body = _raw(_client(), "/json", accept_encoding)
+    assert "content-encoding" not in response.headers
+    assert body == BIG_JSON
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/events"])
+def test_small_unlisted_and_event_stream_bodies_pass_through(path):
+    response, _ = _raw(_client(), path, "gzip")
+    assert "content-encoding" not in response.headers
+
+
+def test_already_encoded_responses_are_not_compressed_twice():
+    response, body = _raw(_client(), "/stored", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BIG_JSON
+
+
+def test_minimum_size_is_configurable():
+    response, body = _raw(_client(minimum_size=1), "/small", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == b'{"ok":true}'
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    response, body = _raw(_client(), "/csv", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == b"row,0\nrow,1\nrow,2\n"
+
+
+def test_existing_vary_header_is_extended():
+    response, _ = _raw(_client(), "/text", "gzip")
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from app.config import settings
+from app.ml import crop_recommender
+from app.ml.crop_recommender import FEATURES, CropRecommender, load_sklearn_pipeline, predict_labels, rank_crops
+
+LOW = np.array([0, 0, 0, 0, 0, 3, 0], dtype=np.float64)
+HIGH = np.array([150, 150, 210, 50, 100, 10, 320], dtype=np.float64)
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return load_sklearn_pipeline()
+
+
+@pytest.fixture(scope="module")
+def recommender(pipeline):
+    return CropRecommender.from_sklearn(*pipeline)
+
+
+def _reference(pipeline, features):
+    ms, sc, model = pipeline
+    scaled = sc.transform(ms.transform(features))
+    return scaled, model.predict(scaled), model.predict_proba(scaled)
+
+
+def _random_rows(n_rows: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    features = rng.uniform(LOW, HIGH, size=(n_rows, len(FEATURES)))
+    # whole-number readings, as most clients send them
+    features[: n_rows // 10] = np.round(features[: n_rows // 10])
+    return features
+
+
+def _edge_rows(recommender) -> np.ndarray:
+    features = [LOW, HIGH, LOW - 100, HIGH * 10, np.zeros(len(FEATURES)), np.full(len(FEATURES), 1e6)]
+    # rows whose scaled value lands on the first split of every tree
+    forest = recommender.forest
+    for root in forest.roots[:20]:
+        row = (LOW + HIGH) / 2
+        column = forest.feature[root]
+        row[column] = (forest.threshold[root] - recommender.offset[column]) / recommender.scale[column]
+        features.append(row)
+    return np.array(features)
+
+
+def test_fused_scaling_matches_the_two_scalers(pipeline, recommender):
+    features = _random_rows(2000)
+    scaled, _, _ = _reference(pipeline, features)
+    np.testing.assert_allclose(recommender.transform(features), scaled, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("rows", ["random", "edge"])
+def test_labels_and_probabilities_match_sklearn(pipeline, recommender, rows):
+    features = _random_rows(20000) if rows == "random" else _edge_rows(recommender)
+    _, labels, proba = _reference(pipeline, features)
+
+    np.testing.assert_array_equal(recommender.predict(features), labels)
+    np.testing.assert_allclose(recommender.predict_proba(features), proba, rtol=0, atol=1e-9)
+
+
+def test_single_rows_match_sklearn(pipeline, recommender):
+    features = _random_rows(50, seed=1)
+    _, labels, proba = _reference(pipeline, features)
+    for i in range(len(features)):
+        assert recommender.predict(features[i:i + 1])[0] == labels[i]
+        np.testing.assert_allclose(recommender.predict_proba(features[i:i + 1])[0], proba[i], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("n_rows", [1, settings.CROP_FLAT_FOREST_MAX_ROWS, settings.CROP_FLAT_FOREST_MAX_ROWS + 1, 1000])
+def test_predict_labels_matches_sklearn_on_both_paths(pipeline, n_rows):
+    features = _random_rows(n_rows, seed=2)
+    _, labels, _ = _reference(pipeline, features)
+    np.testing.assert_array_equal(predict_labels(features), labels)
+
+
+def test_large_batches_use_sklearn(monkeypatch):
+    calls = []
+    real_get = crop_recommender.registry.get
+    monkeypatch.setattr(crop_recommender.registry, "get", lambda name: calls.append(name) or real_get(name))
+
+    predict_labels(_random_rows(settings.CROP_FLAT_FOREST_MAX_ROWS))
+    predict_labels(_random_rows(settings.CROP_FLAT_FOREST_MAX_ROWS + 1))
+    assert calls == ["crop.recommender", "crop.sklearn"]
+
+
+def test_rank_crops_is_sorted_and_agrees_with_predict(recommender):
+    features = _random_rows(100, seed=3)
+    ranked = rank_crops(features, 3)
+    labels = recommender.predict(features)
+    for row, label in zip(ranked, labels):
+        assert row[0]["label"] == label
+        assert [c["probability"] for c in row] == sorted((c["probability"] for c in row), reverse=True)
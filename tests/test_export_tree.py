@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from app.ml.bundle import load_arrays, read_meta, save_arrays
+from app.ml.crop_recommender import load_sklearn_pipeline
+from app.ml.export_tree import export
+from app.ml.registry import file_digest, registry
+from app.ml.trees import FlatTreeEnsemble, TREE_LEAF
+from app.ml.yield_predictor import COLUMNS, DTR_PATH
+
+
+def _load(path) -> FlatTreeEnsemble:
+    arrays, _ = load_arrays(str(path), mmap_mode=True)
+    return FlatTreeEnsemble.from_arrays(arrays)
+
+
+def _edge_cases(X: np.ndarray, trees, seed: int = 0) -> dict:
+    """
+    Rows moved onto a split threshold of a random internal node, and one
+    float32 step either side of it, plus extreme and all-zero rows.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = [(tree, node) for tree in trees for node in np.flatnonzero(tree.children_left != TREE_LEAF)]
+    picked = [nodes[i] for i in rng.integers(len(nodes), size=len(X))]
+    feature = np.array([tree.feature[node] for tree, node in picked])
+    threshold = np.array([tree.threshold[node] for tree, node in picked]).astype(np.float32)
+
+    cases = {}
+    for name, nudge in (("on threshold", 0), ("below threshold", -1), ("above threshold", 1)):
+        edged = X.copy()
+        edged[np.arange(len(X)), feature] = np.nextafter(threshold, np.float32(np.inf * nudge)) if nudge else threshold
+        cases[name] = edged
+    cases["extremes"] = np.vstack([X[:50] * 1e6, X[:50] * -1e6, np.zeros_like(X[:50])])
+    return cases
+
+
+# ---- yield DecisionTreeRegressor ----
+
+@pytest.fixture(scope="module")
+def yield_rows():
+    areas, items = registry.get("yield.preprocessor").named_transformers_["OHE"].categories_
+    rng = np.random.default_rng(0)
+    n_rows = 20000
+    raw = np.empty((n_rows, len(COLUMNS)), dtype=object)
+    raw[:, 0] = rng.integers(1985, 2030, n_rows)
+    raw[:, 1] = rng.uniform(0, 3500, n_rows)
+    raw[:, 2] = rng.uniform(0, 400000, n_rows)
+    raw[:, 3] = rng.uniform(-5, 35, n_rows)
+    raw[:, 4] = rng.choice(areas, n_rows)
+    raw[:, 5] = rng.choice(items, n_rows)
+    pairs = [(area, item) for area in areas for item in items]
+    raw[: len(pairs), 4:6] = pairs
+    return registry.get("yield.encoder").transform(raw)
+
+
+@pytest.fixture(scope="module")
+def dtr():
+    return registry.get("yield.sklearn")
+
+
+@pytest.fixture(scope="module")
+def exported_dtr(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bundles") / "yield_dtr.kma"
+    assert export(DTR_PATH, str(path)) == str(path)
+    return path
+
+
+def _assert_same_as_dtr(dtr, flat: FlatTreeEnsemble, X: np.ndarray):
+    np.testing.assert_array_equal(flat.predict_value(X)[:, 0], dtr.predict(X))
+    np.testing.assert_array_equal(flat.apply(X)[:, 0], dtr.apply(X))
+
+
+def test_export_writes_the_source_metadata(dtr, exported_dtr):
+    meta = read_meta(str(exported_dtr))
+    assert meta["source_sha256"] == file_digest(DTR_PATH)
+    assert meta["node_count"] == dtr.tree_.node_count
+    assert meta["n_features"] == dtr.n_features_in_
+
+
+def test_exported_tree_matches_sklearn_on_batches(dtr, exported_dtr, yield_rows):
+    _assert_same_as_dtr(dtr, _load(exported_dtr), yield_rows)
+
+
+def test_exported_tree_matches_sklearn_on_single_rows(dtr, exported_dtr, yield_rows):
+    flat = _load(exported_dtr)
+    for i in range(200):
+        _assert_same_as_dtr(dtr, flat, yield_rows[i:i + 1])
+
+
+@pytest.mark.parametrize("case", ["on threshold", "below threshold", "above threshold", "extremes"])
+def test_exported_tree_matches_sklearn_on_edges(dtr, exported_dtr, yield_rows, case):
+    _assert_same_as_dtr(dtr, _load(exported_dtr), _edge_cases(yield_rows, [dtr.tree_])[case])
+
+
+# ---- crop RandomForestClassifier ----
+
+@pytest.fixture(scope="module")
+def crop_pipeline():
+    return load_sklearn_pipeline()
+
+
+@pytest.fixture(scope="module")
+def crop_rows(crop_pipeline):
+    ms, sc, _ = crop_pipeline
+    rng = np.random.default_rng(1)
+    low = np.array([0, 0, 0, 0, 0, 3, 0], dtype=np.float64)
+    high = np.array([150, 150, 210, 50, 100, 10, 320], dtype=np.float64)
+    return sc.transform(ms.transform(rng.uniform(low, high, size=(5000, len(low)))))
+
+
+@pytest.fixture(scope="module")
+def exported_forest(crop_pipeline, tmp_path_factory):
+    path = tmp_path_factory.mktemp("bundles") / "crop_forest.kma"
+    save_arrays(str(path), FlatTreeEnsemble.from_sklearn(crop_pipeline[2], normalize=True).to_arrays(), {})
+    return path
+
+
+def _assert_same_as_forest(model, flat: FlatTreeEnsemble, X: np.ndarray):
+    np.testing.assert_allclose(flat.predict_value(X), model.predict_proba(X), rtol=0, atol=1e-9)
+    # flat leaf ids are offset by where each tree starts in the shared node arrays
+    np.testing.assert_array_equal(flat.apply(X) - flat.roots, model.apply(X))
+
+
+def test_exported_forest_matches_sklearn_on_batches(crop_pipeline, exported_forest, crop_rows):
+    _assert_same_as_forest(crop_pipeline[2], _load(exported_forest), crop_rows)
+
+
+def test_exported_forest_matches_sklearn_on_single_rows(crop_pipeline, exported_forest, crop_rows):
+    flat = _load(exported_forest)
+    for i in range(50):
+        _assert_same_as_forest(crop_pipeline[2], flat, crop_rows[i:i + 1])
+
+
+@pytest.mark.parametrize("case", ["on threshold", "below threshold", "above threshold", "extremes"])
+def test_exported_forest_matches_sklearn_on_edges(crop_pipeline, exported_forest, crop_rows, case):
+    model = crop_pipeline[2]
+    edges = _edge_cases(crop_rows, [e.tree_ for e in model.estimators_])
+    _assert_same_as_forest(model, _load(exported_forest), edges[case])
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import orjson
+import pytest
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.jobs.guidance import save_guidance
+from app.Tables.CropGuidance import CropGuidances
+from app.Tables.GuidanceBlobs import GuidanceBlob
+from app.utils import guidance_blobs
+from app.utils.auth import get_current_user
+from app.utils.compression import inflate_segment
+from app.utils.guidance_blobs import canonical_guidance, store_guidance_blob
+from app.utils.identity import Principal
+from schema import CropFormRequest
+
+FORM = CropFormRequest(
+    crop="Wheat", land_size=5, soil_type="Loamy", location="Punjab, India", irrigation="Drip",
+    fertilizer={"type": "Urea", "amount": 50, "schedule": "Basal"},
+)
+
+
+def _guidance(n: int) -> dict:
+    return {"summary": f"summary {n}", "steps": [{"step": s, "details": "Irrigate lightly. " * 40} for s in range(20)], "n": n}
+
+
+@pytest.fixture(autouse=True)
+def sqlite_upsert(monkeypatch):
+    # SQLite's INSERT has the same ON CONFLICT DO UPDATE API as Postgres'
+    monkeypatch.setattr(guidance_blobs, "pg_insert", sqlite_insert)
+
+
+def _blobs(db) -> dict:
+    return {blob.sha256: blob.ref_count for blob in db.query(GuidanceBlob)}
+
+
+def test_identical_guidance_is_stored_once(db_sessionmaker):
+    reordered = dict(reversed(list(_guidance(1).items())))
+    with db_sessionmaker() as db:
+        first = save_guidance(db, 1, FORM, _guidance(1))
+        second = save_guidance(db, 2, FORM, reordered)
+        other = save_guidance(db, 1, FORM, _guidance(2))
+
+        assert first.guidance_sha256 == second.guidance_sha256 != other.guidance_sha256
+        assert _blobs(db) == {first.guidance_sha256: 2, other.guidance_sha256: 1}
+
+
+def test_blob_holds_the_compressed_canonical_json(db_sessionmaker):
+    guidance = _guidance(1)
+    with db_sessionmaker() as db:
+        sha256 = store_guidance_blob(db, guidance)
+        blob = db.get(GuidanceBlob, sha256)
+
+        data = canonical_guidance(guidance)
+        assert sha256 == hashlib.sha256(data).hexdigest()
+        assert inflate_segment(blob.content) == data
+        assert blob.size == len(data) > len(blob.content)
+        assert blob.summary == "summary 1"
+
+
+def test_guidance_response_reads_back_the_document(db_sessionmaker):
+    with db_sessionmaker() as db:
+        entry_id = save_guidance(db, 1, FORM, _guidance(1)).id
+    with db_sessionmaker() as db:
+        assert db.get(CropGuidances, entry_id).guidance_response == _guidance(1)
+
+
+def test_deleting_rows_releases_the_blob(db_sessionmaker):
+    with db_sessionmaker() as db:
+        first = save_guidance(db, 1, FORM, _guidance(1))
+        second = save_guidance(db, 2, FORM, _guidance(1))
+        sha256 = first.guidance_sha256
+
+        db.delete(first)
+        db.commit()
+        assert _blobs(db) == {sha256: 1}
+
+        db.delete(second)
+        db.commit()
+        assert _blobs(db) == {}
+
+        # stored again from scratch after the last reference went away
+        assert save_guidance(db, 1, FORM, _guidance(1)).guidance_sha256 == sha256
+        assert _blobs(db) == {sha256: 1}
+
+
+def test_rolled_back_rows_keep_no_reference(db_sessionmaker):
+    with db_sessionmaker() as db:
+        save_guidance(db, 1, FORM, _guidance(1), commit=False)
+        db.rollback()
+        assert _blobs(db) == {}
+
+
+def test_a_blob_inserted_by_another_writer_is_bumped_not_duplicated(db_sessionmaker, monkeypatch):
+    with db_sessionmaker() as db:
+        sha256 = store_guidance_blob(db, _guidance(1))
+        db.commit()
+
+        # this writer's UPDATE ran before the other writer's INSERT committed
+        execute = db.execute
+        monkeypatch.setattr(db, "execute", lambda stmt, *a, **kw: SimpleNamespace(rowcount=0)
+                            if stmt.is_update else execute(stmt, *a, **kw))
+        assert store_guidance_blob(db, _guidance(1)) == sha256
+        monkeypatch.setattr(db, "execute", execute)
+        db.commit()
+
+        assert _blobs(db) == {sha256: 2}
+
+
+def test_the_postgres_upsert_bumps_the_count_on_conflict(monkeypatch):
+    monkeypatch.setattr(guidance_blobs, "pg_insert", postgresql.insert)
+    statements = []
+    recorder = SimpleNamespace(execute=lambda stmt: statements.append(stmt) or SimpleNamespace(rowcount=0))
+
+    store_guidance_blob(recorder, _guidance(1))
+    sql = str(statements[-1].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (sha256) DO UPDATE SET ref_count = (guidance_blobs.ref_count +" in sql
+
+
+# ---- routes ----
+
+@pytest.fixture
+def guidance_client(client, db_sessionmaker):
+    from app.main import app
+
+    with db_sessionmaker() as db:
+        for n in range(5):
+            save_guidance(db, 1, FORM, _guidance(n % 3))
+        save_guidance(db, 2, FORM, _guidance(9))
+
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=None, is_active=True)
+    return client
+
+
+def _get(client, path: str, accept_encoding: str, **params):
+    with client.stream("GET", path, params=params, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_stored_gzip_list_matches_the_plain_json(guidance_client):
+    plain, plain_body = _get(guidance_client, "/crop_guidance/user_guidance", "identity", limit=10)
+    stored, stored_body = _get(guidance_client, "/crop_guidance/user_guidance", "gzip", limit=10)
+
+    assert stored.headers["content-encoding"] == "gzip"
+    assert orjson.loads(gzip.decompress(stored_body)) == orjson.loads(plain_body)
+    rows = orjson.loads(plain_body)
+    # rows 1-5 belong to user 1; row 6 is user 2's
+    assert {row["id"]: row["guidance_response"]["n"] for row in rows} == {1: 0, 2: 1, 3: 2, 4: 0, 5: 1}
+
+
+def test_stored_gzip_detail_matches_the_plain_json(guidance_client):
+    plain, plain_body = _get(guidance_client, "/crop_guidance/user_guidance/2", "identity")
+    stored, stored_body = _get(guidance_client, "/crop_guidance/user_guidance/2", "gzip")
+
+    assert stored.headers["content-encoding"] == "gzip"
+    assert orjson.loads(gzip.decompress(stored_body)) == orjson.loads(plain_body)
+    assert orjson.loads(plain_body)["guidance_response"] == _guidance(1)
+
+
+def test_summary_view_reads_the_blob_summary(guidance_client):
+    response = guidance_client.get("/crop_guidance/user_guidance", params={"view": "summary"})
+    assert {row["id"]: row["summary"] for row in response.json()} == {
+        1: "summary 0", 2: "summary 1", 3: "summary 2", 4: "summary 0", 5: "summary 1",
+    }
+    assert all("guidance_response" not in row for row in response.json())
+
+
+def test_other_users_guidance_is_not_found(guidance_client):
+    assert guidance_client.get("/crop_guidance/user_guidance/6").status_code == 404
@@ -0,0 +1,165 @@
+import asyncio
+import fakeredis
+import pytest
+from app.jobs import queue
+from app.jobs.queue import AsyncioJobBackend, QueueFull, register_job
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(queue, "async_redis_client", client)
+    return client
+
+
+@pytest.fixture
+def ran():
+    """Arguments of every run of the test.record job."""
+    calls = []
+
+    @register_job("test.record")
+    async def record(*args):
+        calls.append(list(args))
+
+    yield calls
+    queue.JOBS.pop("test.record")
+
+
+async def _until(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_a_job_submitted_on_one_worker_runs_and_reports_on_another(redis, ran):
+    async def run():
+        submitter, runner = AsyncioJobBackend(1, 10), AsyncioJobBackend(1, 10)
+        await submitter.store.create("job1", {"status": "queued"})
+        await submitter.submit("test.record", "job1", 7)
+        await runner.start()
+        try:
+            await _until(lambda: ran)
+        finally:
+            await runner.stop()
+        await runner.store.update("job1", status="done")
+        return await submitter.store.get("job1")
+
+    assert asyncio.run(run()) == {"status": "done"}
+    assert ran == [["job1", 7]]
+
+
+def test_jobs_queued_before_a_restart_run_after_it(redis, ran):
+    async def run():
+        # submitted while no process was consuming the queue
+        await AsyncioJobBackend(1, 10).submit("test.record", "job1")
+        backend = AsyncioJobBackend(1, 10)
+        await backend.start()
+        try:
+            await _until(lambda: ran)
+        finally:
+            await backend.stop()
+
+    asyncio.run(run())
+    assert ran == [["job1"]]
+
+
+def test_submit_is_bounded_by_the_shared_queue(redis):
+    async def run():
+        first, second = AsyncioJobBackend(1, 2), AsyncioJobBackend(1, 2)
+        await first.submit("test.record", 1)
+        await second.submit("test.record", 2)
+        with pytest.raises(QueueFull):
+            await first.submit("test.record", 3)
+        return await second.stats()
+
+    assert asyncio.run(run())["pending"] == 2
+
+
+def test_a_job_cancelled_at_shutdown_is_queued_again(redis):
+    started = []
+
+    @register_job("test.slow")
+    async def slow(*args):
+        started.append(args)
+        await asyncio.sleep(60)
+
+    async def run():
+        backend = AsyncioJobBackend(1, 10)
+        await backend.submit("test.slow", "job1")
+        await backend.start()
+        await _until(lambda: started)
+        await backend.stop()
+        return await redis.lrange(backend.queue_key, 0, -1)
+
+    try:
+        assert asyncio.run(run()) == ['{"name": "test.slow", "args": ["job1"]}']
+    finally:
+        queue.JOBS.pop("test.slow")
+
+
+# ---- Celery backend ----
+
+@pytest.fixture
+def celery_backend(redis, monkeypatch):
+    from kombu.exceptions import OperationalError
+    from app.jobs.queue import CeleryJobBackend
+
+    backend = CeleryJobBackend()
+    backend.sent = []
+
+    def send_task(name, args):
+        try:
+            asyncio.get_running_loop()
+            backend.sent.append("on the event loop")
+        except RuntimeError:
+            backend.sent.append((name, args))
+        if backend.broker_down:
+            raise OperationalError("Connection refused")
+
+    backend.broker_down = False
+    monkeypatch.setattr(backend.celery_app, "send_task", send_task)
+    monkeypatch.setattr(queue, "_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def guidance_jobs(client, celery_backend):
+    from app.main import app
+    from app.utils.auth import get_current_user
+    from app.utils.identity import Principal
+
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=None, is_active=True)
+    return client
+
+
+FORM = {"crop": "Wheat", "land_size": 5, "soil_type": "Loamy", "location": "Punjab, India", "irrigation": "Drip",
+        "fertilizer": {"type": "Urea", "amount": 50, "schedule": "Basal"}}
+
+
+def test_celery_publishes_from_a_worker_thread(guidance_jobs, celery_backend):
+    response = guidance_jobs.post("/crop_guidance/jobs", json=FORM)
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+    [(name, args)] = celery_backend.sent
+    assert name == "guidance.generate"
+    assert args[:2] == [job_id, 1] and args[2]["crop"] == "Wheat"
+    assert guidance_jobs.get(f"/crop_guidance/jobs/{job_id}").json()["status"] == "queued"
+
+
+def test_broker_down_answers_503_and_rejects_the_job(guidance_jobs, celery_backend):
+    celery_backend.broker_down = True
+    response = guidance_jobs.post("/crop_guidance/jobs", json=FORM)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    job_id = celery_backend.sent[0][1][0]
+    assert guidance_jobs.get(f"/crop_guidance/jobs/{job_id}").json()["status"] == "rejected"
+
+
+def test_redis_down_answers_503(guidance_jobs, monkeypatch):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(queue, "async_redis_client", fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    response = guidance_jobs.post("/crop_guidance/jobs", json=FORM)
+    assert response.status_code == 503
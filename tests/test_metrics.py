@@ -0,0 +1,30 @@
+import pytest
+from app.main import app
+from app.Tables.UserTable import UserRole
+from app.utils.auth import get_current_user
+from app.utils.identity import Principal
+
+PATHS = ["/metrics/gemini_cache", "/metrics/gemini_inflight", "/metrics/jobs", "/metrics/models",
+         "/metrics/identity", "/metrics/passwords", "/metrics/db_pool"]
+
+
+def _as(role):
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=role, is_active=True)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_metrics_need_a_token(client, path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_metrics_are_admin_only(client, path):
+    _as(UserRole.FARMER)
+    assert client.get(path).status_code == 403
+
+
+def test_admins_can_read_metrics(client):
+    _as(UserRole.ADMIN)
+    response = client.get("/metrics/models")
+    assert response.status_code == 200
+    assert "crop.recommender" in response.json()
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.jobs.guidance import save_guidance
+from app.Tables.CropGuidance import CropGuidances
+from app.Tables.CropRecommendations import CropRecommendation
+from app.Tables.Feedbacks import Feedback
+from app.Tables.Notiifcaitions import Notification
+from app.Tables.YieldPredictionTable import CropPrediction
+from app.utils import guidance_blobs
+from app.utils.auth import get_current_user
+from app.utils.identity import Principal
+from app.utils.pagination import PageParams, decode_cursor, encode_cursor, keyset, split_page
+from schema import CropFormRequest
+
+START = datetime(2025, 9, 18, 11, 52, 32, 123456)
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2025, 9, 18, 11, 52, 32, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    # url safe and unpadded, so it can go in a query string as is
+    assert set(encode_cursor(created_at, 42)) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "bm90IGpzb24", "WyIyMDI1Il0", "WzEsMl0"])
+def test_invalid_cursors_are_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+
+@pytest.fixture
+def notifications(db_sessionmaker):
+    """25 rows for user 1, three to a timestamp, interleaved with another user's."""
+    with db_sessionmaker() as db:
+        for i in range(25):
+            created_at = START - timedelta(seconds=i // 3)
+            db.add(Notification(user_id=1, title=f"n{i}", message="m", created_at=created_at))
+            db.add(Notification(user_id=2, title=f"other{i}", message="m", created_at=created_at))
+        db.commit()
+        expected = [n.id for n in db.query(Notification).filter(Notification.user_id == 1)
+                    .order_by(Notification.created_at.desc(), Notification.id)]
+    return expected
+
+
+def _walk(fetch, limit: int):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = PageParams(cursor, limit)
+        rows, cursor = split_page(fetch(page), page)
+        assert len(rows) <= limit
+        ids += [row.id for row in rows]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 25, 100])
+def test_keyset_pages_cover_every_row_once(db_sessionmaker, notifications, limit):
+    with db_sessionmaker() as db:
+        ids, pages = _walk(lambda page: db.execute(keyset(
+            select(Notification).where(Notification.user_id == 1), Notification, page
+        )).scalars().all(), limit)
+
+    assert ids == notifications
+    assert pages == max(1, -(-len(notifications) // limit))
+
+
+def test_keyset_works_on_orm_queries_and_column_selects(db_sessionmaker, notifications):
+    with db_sessionmaker() as db:
+        ids, _ = _walk(lambda page: keyset(
+            db.query(Notification.id, Notification.created_at).filter(Notification.user_id == 1), Notification, page
+        ).all(), 4)
+    assert ids == notifications
+
+
+def test_last_full_page_has_no_next_cursor():
+    page = PageParams(None, 2)
+    rows = [type("Row", (), {"id": i, "created_at": START})() for i in range(2)]
+    assert split_page(rows, page) == (rows, None)
+
+
+# ---- routes ----
+
+def _rows(n: int) -> dict:
+    """Seven rows of user 1 per table, a few sharing each timestamp, plus one of user 2's."""
+    return {"user_id": 1 if n < 7 else 2, "created_at": START - timedelta(seconds=n // 2)}
+
+
+def _guidance(n: int, db) -> CropGuidances:
+    form = CropFormRequest(crop="Wheat", land_size=5, soil_type="Loamy", location="Punjab", irrigation="Drip",
+                           fertilizer={"type": "Urea", "amount": 50, "schedule": "Basal"})
+    row = save_guidance(db, _rows(n)["user_id"], form, {"summary": f"g{n}"}, commit=False)
+    row.created_at = _rows(n)["created_at"]
+    return row
+
+
+SEEDS = {
+    "/notifications/my_notifications": lambda n, db: Notification(title=f"n{n}", message="m", **_rows(n)),
+    "/feedbacks/my_feedbacks": lambda n, db: Feedback(rating=5, comment=f"f{n}", **_rows(n)),
+    "/crop_recommendation/recommendations": lambda n, db: CropRecommendation(predicted_crop="Rice", **_rows(n)),
+    "/yeild_prediction/my_predictions": lambda n, db: CropPrediction(
+        item="Maize", area="India", year=2013, predicted_yield=1, predicted_crop="Maize", **_rows(n)),
+    "/crop_guidance/user_guidance": _guidance,
+}
+
+# the body keeps each endpoint's unpaginated shape: a list, or the list under one key
+BODY_KEYS = {"/feedbacks/my_feedbacks": "feedbacks", "/crop_recommendation/recommendations": "recommendations",
+             "/yeild_prediction/my_predictions": "yield_predictions"}
+
+
+@pytest.fixture
+def history_client(client, db_sessionmaker, monkeypatch):
+    from app.main import app
+
+    # SQLite's INSERT has the same ON CONFLICT DO UPDATE API as Postgres'
+    monkeypatch.setattr(guidance_blobs, "pg_insert", sqlite_insert)
+    with db_sessionmaker() as db:
+        for seed in SEEDS.values():
+            db.add_all([seed(n, db) for n in range(8)])
+        db.commit()
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=None, is_active=True)
+    return client
+
+
+@pytest.mark.parametrize("path", SEEDS)
+def test_every_list_pages_through_the_cursor_header(history_client, path):
+    ids, params = [], {"limit": 3}
+    while True:
+        response = history_client.get(path, params=params, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert "next_cursor" not in body
+        rows = body[BODY_KEYS[path]] if path in BODY_KEYS else body
+        ids += [row["id"] for row in rows]
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    # newest first, oldest id first within a timestamp, user 2's row left out
+    assert ids == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_cursor_header_is_exposed_to_browsers(history_client):
+    response = history_client.get("/notifications/my_notifications", params={"limit": 1},
+                                  headers={"Origin": "https://app.example.com"})
+    assert response.headers["x-next-cursor"]
+    exposed = [h.strip().lower() for h in response.headers["access-control-expose-headers"].split(",")]
+    assert "x-next-cursor" in exposed
+
+
+def test_stored_gzip_guidance_sends_the_cursor_header(history_client):
+    with history_client.stream("GET", "/crop_guidance/user_guidance", params={"limit": 3},
+                               headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert decode_cursor(response.headers["x-next-cursor"])[1] == 3
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database.database import checkout_within
+from app.database.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, checkout_budget
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=5, connect_args={"check_same_thread": False},
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkout_within_answers_503_after_the_budget(engine):
+    Session = sessionmaker(bind=engine)
+    with Session() as holder, Session() as waiter:
+        checkout_within(holder, budget=0.05)
+        with pytest.raises(HTTPException) as e:
+            checkout_within(waiter, budget=0.05)
+
+    assert e.value.status_code == 503
+    assert e.value.headers == {"Retry-After": "1"}
+    stats = engine.pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["checkouts"] == 2
+    # the budget only shortened that one wait
+    assert stats["timeout_seconds"] == 5
+
+
+def test_threads_waiting_together_are_all_counted(engine):
+    holder = engine.connect()
+    errors = []
+
+    def wait():
+        with checkout_budget(0.1):
+            try:
+                engine.connect()
+            except exc.TimeoutError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=wait) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    holder.close()
+
+    assert len(errors) == 4
+    assert engine.pool.stats()["timeouts"] == 4
+    assert engine.pool.stats()["checkouts"] == 5
+
+
+def test_coroutines_waiting_together_are_all_counted(tmp_path):
+    async def run():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedAsyncQueuePool,
+            pool_size=1, max_overflow=0, pool_timeout=0.1,
+        )
+        pool = engine.sync_engine.pool
+        holder = await engine.connect()
+
+        async def attempt():
+            try:
+                async with engine.connect():
+                    return "connected"
+            except exc.TimeoutError:
+                return "timeout"
+
+        try:
+            # every coroutine waits on the loop thread at the same time
+            results = await asyncio.gather(*[attempt() for _ in range(4)])
+        finally:
+            await holder.close()
+            await engine.dispose()
+        return results, pool.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["timeout"] * 4
+    assert stats["timeouts"] == 4
+    assert stats["checkouts"] == 5
+    assert stats["wait_histogram_seconds"]["0.25"] - stats["wait_histogram_seconds"]["0.05"] == 4
+
+
+def test_predict_holds_no_connection_while_gemini_answers(engine, fake_redis, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database.database import Base, get_db
+    from app.routes import CropPrediction
+    from app.Tables.CropRecommendations import CropRecommendation
+    from app.Tables.UserTable import User, UserRole
+    from app.utils.identity import identity_cache
+    from app.utils.jwt import create_access_token
+
+    Base.metadata.create_all(engine, tables=[User.__table__, CropRecommendation.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="a@example.com", phone_number="9876543210", full_name="A", password_hash="x",
+                    terms_and_condition_followed=True, role=UserRole.FARMER, is_active=True))
+        db.commit()
+    identity_cache.invalidate(1)
+
+    in_use_during_gemini = []
+
+    async def fake_gemini(payload, api_key):
+        in_use_during_gemini.append(engine.pool.checkedout())
+        return {"predicted_crop": payload["crop"], "summary": "ok"}
+
+    def _get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(CropPrediction, "acall_gemini", fake_gemini)
+    app.dependency_overrides[get_db] = _get_db
+    try:
+        response = TestClient(app).post(
+            "/crop_recommendation/predict",
+            json={"Nitrogen": 90, "Phosphorus": 42, "Potassium": 43, "Temperature": 20.8,
+                  "Humidity": 82, "Ph": 6.5, "Rainfall": 202.9},
+            headers={"Authorization": f"Bearer {create_access_token({'sub': '1'})}"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200, response.text
+    # the user lookup ran before Gemini, but its connection was already back in the pool
+    assert in_use_during_gemini == [0]
+    with Session() as db:
+        assert db.query(CropRecommendation).count() == 1
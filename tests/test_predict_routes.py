@@ -0,0 +1,61 @@
+import asyncio
+import numpy as np
+import pytest
+from app.main import app
+from app.routes import CropPrediction, YieldPrediction
+from app.utils.auth import get_current_user
+from app.utils.identity import Principal
+
+CROP = {"Nitrogen": 90, "Phosphorus": 42, "Potassium": 43, "Temperature": 20.8, "Humidity": 82, "Ph": 6.5, "Rainfall": 202.9}
+YIELD = {"Year": 2013, "average_rain_fall_mm_per_year": 1083, "pesticides_tonnes": 121, "avg_temp": 16.4,
+         "Area": "Albania", "Item": "Maize"}
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@pytest.fixture
+def calls(client, monkeypatch):
+    """Records, for every model call, whether it ran on the event loop thread."""
+    calls = []
+
+    def recording(fn):
+        def wrapper(*args, **kwargs):
+            calls.append(_on_event_loop())
+            return fn(*args, **kwargs)
+        return wrapper
+
+    async def fake_gemini(payload, api_key):
+        return {"summary": "ok", **payload}
+
+    monkeypatch.setattr(CropPrediction, "predict_labels", recording(lambda features: np.ones(len(features), dtype=int)))
+    monkeypatch.setattr(CropPrediction, "rank_crops", recording(
+        lambda features, k: [[{"label": 1, "crop": "Rice", "probability": 0.9}] * k]))
+    monkeypatch.setattr(YieldPrediction.yield_predictor, "predict", recording(lambda features: np.full(len(features), 1.0)))
+    for module, name in ((CropPrediction, "acall_gemini"), (YieldPrediction, "acall_gemini_yield")):
+        monkeypatch.setattr(module, name, fake_gemini)
+    monkeypatch.setattr(CropPrediction, "_save_recommendation", lambda *args: None)
+    monkeypatch.setattr(YieldPrediction, "_save_prediction", lambda *args: None)
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=None, is_active=True)
+    return calls
+
+
+def test_crop_predict_runs_the_model_off_the_event_loop(client, calls):
+    assert client.post("/crop_recommendation/predict", json=CROP).status_code == 200
+    assert calls == [False]
+
+
+def test_ranked_crop_predict_runs_the_model_off_the_event_loop(client, calls):
+    response = client.post("/crop_recommendation/predict", params={"top_k": 3}, json=CROP)
+    assert response.status_code == 200
+    assert calls == [False]
+
+
+def test_yield_predict_runs_the_model_off_the_event_loop(client, calls):
+    assert client.post("/yeild_prediction/predict", json=YIELD).status_code == 200
+    assert calls == [False]
@@ -0,0 +1,37 @@
+import pytest
+from app.main import app
+from app.Tables.CropRecommendations import CropRecommendation
+from app.utils.auth import get_current_user
+from app.utils.identity import Principal
+from schema import RecommendationOut
+
+STORED = {None: [], "": [], "  ": [], "null": [], "[]": [], '["Frost", "Pests"]': ["Frost", "Pests"],
+          # free text written before risk factors were stored as JSON
+          "Frost in late March": ["Frost in late March"]}
+
+
+@pytest.mark.parametrize("stored, expected", STORED.items())
+def test_risk_factors_keep_the_list_shape(stored, expected):
+    assert RecommendationOut(id=1, risk_factors=stored).risk_factors == expected
+
+
+@pytest.fixture
+def recommendations(client, db_sessionmaker):
+    with db_sessionmaker() as db:
+        rows = [CropRecommendation(user_id=1, predicted_crop="Rice", risk_factors=stored) for stored in STORED]
+        db.add_all(rows)
+        db.commit()
+        ids = {row.id: expected for row, expected in zip(rows, STORED.values())}
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, role=None, is_active=True)
+    return ids
+
+
+def test_list_and_detail_answer_with_legacy_risk_factors(client, recommendations):
+    response = client.get("/crop_recommendation/recommendations", params={"limit": 50})
+    assert response.status_code == 200, response.text
+    assert {row["id"]: row["risk_factors"] for row in response.json()["recommendations"]} == recommendations
+
+    for rec_id, expected in recommendations.items():
+        response = client.get(f"/crop_recommendation/recommendations/{rec_id}")
+        assert response.status_code == 200, response.text
+        assert response.json()["risk_factors"] == expected
@@ -0,0 +1,73 @@
+import itertools
+import time
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from app.utils import jwt as jwt_utils
+from app.utils import sessions
+from app.utils.jwt import create_access_token, token_claims, verify_token
+
+# the start of the current second, so tokens are not already expired
+START_MS = int(time.time()) * 1000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Each call is one millisecond later, all within the same second."""
+    ticks = itertools.count(START_MS)
+    monkeypatch.setattr(sessions, "now_ms", lambda: next(ticks))
+    monkeypatch.setattr(jwt_utils, "now_ms", lambda: next(ticks))
+
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(sessions, "redis_client", fakeredis.FakeStrictRedis(server=server, decode_responses=True))
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _login(user_id: int = 1) -> str:
+    token = create_access_token({"sub": str(user_id)})
+    claims = token_claims(token)
+    sessions.register_session(user_id, claims["jti"], claims["iat"], claims["exp"])
+    return token
+
+
+def test_logout_all_keeps_logins_from_the_same_second(client, clock):
+    before = _login()
+    assert client.post("/auth/logout_all", headers=_bearer(before)).status_code == 200
+    after = _login()
+
+    assert token_claims(before)["iat"] == token_claims(after)["iat"]
+    with pytest.raises(HTTPException) as e:
+        verify_token(before)
+    assert e.value.status_code == 401
+    assert verify_token(after)["sub"] == "1"
+
+
+def test_logout_all_revokes_tokens_without_iat_ms(fake_redis, clock):
+    sessions.revoke_all(1)
+    legacy = {"sub": "1", "jti": "old", "iat": START_MS // 1000 - 1}
+    assert sessions.is_revoked(legacy)
+    assert not sessions.is_revoked({**legacy, "sub": "2"})
+
+
+def test_logout_revokes_only_that_token(client):
+    first, second = _login(), _login()
+    assert client.post("/auth/logout", headers=_bearer(first)).status_code == 200
+
+    assert sessions.is_revoked(token_claims(first))
+    assert not sessions.is_revoked(token_claims(second))
+    assert [s["jti"] for s in sessions.list_sessions(1)] == [token_claims(second)["jti"]]
+
+
+@pytest.mark.parametrize("method, path", [("post", "/auth/logout"), ("post", "/auth/logout_all"), ("get", "/auth/sessions")])
+def test_session_routes_answer_503_when_redis_is_down(client, redis_down, method, path):
+    token = create_access_token({"sub": "1"})
+    response = getattr(client, method)(path, headers=_bearer(token))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
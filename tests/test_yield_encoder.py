@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.config import settings
+from app.ml.registry import registry
+from app.ml.yield_predictor import COLUMNS, YieldEncoder, predict
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    return registry.get("yield.preprocessor")
+
+
+@pytest.fixture(scope="module")
+def encoder(preprocessor):
+    return YieldEncoder.from_sklearn(preprocessor)
+
+
+@pytest.fixture(scope="module")
+def categories(preprocessor):
+    return preprocessor.named_transformers_["OHE"].categories_
+
+
+def _dense(matrix) -> np.ndarray:
+    return matrix.toarray() if hasattr(matrix, "toarray") else matrix
+
+
+def _raw_rows(categories, n_rows: int, seed: int = 0) -> np.ndarray:
+    areas, items = categories
+    rng = np.random.default_rng(seed)
+    features = np.empty((n_rows, len(COLUMNS)), dtype=object)
+    features[:, 0] = rng.integers(1985, 2030, n_rows)
+    features[:, 1] = rng.uniform(0, 3500, n_rows)
+    features[:, 2] = rng.uniform(0, 400000, n_rows)
+    features[:, 3] = rng.uniform(-5, 35, n_rows)
+    features[:, 4] = rng.choice(areas, n_rows)
+    features[:, 5] = rng.choice(items, n_rows)
+    return features
+
+
+def _all_pairs(categories) -> np.ndarray:
+    areas, items = categories
+    features = _raw_rows(categories, len(areas) * len(items), seed=1)
+    features[:, 4:6] = [(area, item) for area in areas for item in items]
+    return features
+
+
+def test_encoding_matches_the_column_transformer_for_every_pair(preprocessor, encoder, categories):
+    features = _all_pairs(categories)
+    reference = _dense(preprocessor.transform(pd.DataFrame(features, columns=COLUMNS)))
+    np.testing.assert_array_equal(encoder.transform(features), reference)
+
+
+def test_encoding_accepts_data_frames(preprocessor, encoder, categories):
+    frame = pd.DataFrame(_raw_rows(categories, 500), columns=COLUMNS)
+    np.testing.assert_array_equal(encoder.transform(frame), _dense(preprocessor.transform(frame)))
+
+
+def test_predictions_match_the_pickled_pipeline(preprocessor, encoder, categories):
+    dtr = registry.get("yield.sklearn")
+    features = np.vstack([_all_pairs(categories), _raw_rows(categories, 20000, seed=2)])
+    reference = _dense(preprocessor.transform(pd.DataFrame(features, columns=COLUMNS)))
+    np.testing.assert_array_equal(dtr.predict(encoder.transform(features)), dtr.predict(reference))
+
+
+@pytest.mark.parametrize("column", [4, 5])
+def test_unknown_category_falls_back_to_the_transformer(encoder, categories, column):
+    features = _raw_rows(categories, 3)
+    features[1, column] = "Atlantis"
+    # raised by the original transformer, exactly as before the fast path
+    with pytest.raises(ValueError, match="unknown categories"):
+        encoder.transform(features)
+
+
+def test_the_registry_encoder_is_read_from_the_bundle(encoder):
+    bundled = registry.get("yield.encoder")
+    for name, array in encoder.to_arrays().items():
+        np.testing.assert_array_equal(getattr(bundled, name), array)
+    # a read-only view over the shared file mapping, not a private copy
+    assert not bundled.pair_blocks.flags.writeable
+
+
+# ---- predict ----
+
+@pytest.fixture
+def no_pickles(monkeypatch):
+    """Fails any load of the sklearn pickles for the duration of the test."""
+    def unpickle():
+        raise AssertionError("pickle loaded")
+    for name in ("yield.sklearn", "yield.preprocessor"):
+        monkeypatch.delitem(registry._models, name, raising=False)
+        monkeypatch.setitem(registry._loaders, name, unpickle)
+
+
+def test_small_batches_use_only_the_bundles(categories, no_pickles):
+    features = _raw_rows(categories, settings.YIELD_FLAT_TREE_MAX_ROWS)
+    assert predict(features).shape == (len(features),)
+
+
+def test_large_batches_match_the_flat_tree(categories):
+    features = _raw_rows(categories, 2000, seed=3)
+    flat = registry.get("yield.dtr").predict_value(registry.get("yield.encoder").transform(features))[:, 0]
+    np.testing.assert_array_equal(predict(features), flat)